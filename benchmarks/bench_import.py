@@ -0,0 +1,116 @@
+"""
+Import hook startup cost
+========================
+
+Credit: A Grigis
+
+Benchmark of the import hook cost for an application with thousands of
+imports. A package with 'NB_MODULES' modules is generated in a temporary
+directory and imported in fresh interpreters, without bredala and with the
+bredala hook installed in front of 'sys.meta_path' and one registered
+module. The per-lookup cost of the hook for distinct unregistered modules is
+also measured, without and with registered module patterns, on the first
+lookup of each name and on the next ones that hit the patterns match
+cache::
+
+    python benchmarks/bench_import.py
+"""
+
+# System import
+import os
+import sys
+import shutil
+import tempfile
+import subprocess
+import time
+
+# Bredala import
+import bredala
+from bredala.modulehacker import BredalaMetaImportHook
+
+
+NB_MODULES = 3000
+NB_RUNS = 7
+NB_LOOKUPS = 200000
+IMPORT_CODE = """
+import sys, time
+sys.path.insert(0, {tmpdir!r})
+{setup}
+start_time = time.perf_counter()
+for index in range({nb_modules}):
+    __import__("benchpkg.mod{{0}}".format(index))
+print(time.perf_counter() - start_time)
+"""
+BREDALA_SETUP = """
+import bredala
+bredala.register("benchpkg.mod0", verbosity="off")
+"""
+
+
+def create_package(tmpdir):
+    """ Generate the benchmark package.
+    """
+    package_dir = os.path.join(tmpdir, "benchpkg")
+    os.mkdir(package_dir)
+    with open(os.path.join(package_dir, "__init__.py"), "wt") as open_file:
+        open_file.write("")
+    for index in range(NB_MODULES):
+        path = os.path.join(package_dir, "mod{0}.py".format(index))
+        with open(path, "wt") as open_file:
+            open_file.write("def function(a, b):\n    return a + b\n")
+
+
+def lookup_times(hook):
+    """ Per-lookup times of the import hook for distinct unregistered
+    modules in nanoseconds: first and cached lookups.
+    """
+    names = ["benchpkg.mod{0}".format(index) for index in range(NB_LOOKUPS)]
+    durations = []
+    for _ in range(2):
+        start_time = time.perf_counter()
+        for name in names:
+            hook.find_spec(name, None)
+        durations.append((time.perf_counter() - start_time) * 1e9 /
+                         NB_LOOKUPS)
+    return durations
+
+
+def import_time(tmpdir, setup):
+    """ Import time of the benchmark package in a fresh interpreter.
+    """
+    code = IMPORT_CODE.format(tmpdir=tmpdir, setup=setup,
+                              nb_modules=NB_MODULES)
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(sys.path)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    output = subprocess.check_output([sys.executable, "-c", code], env=env)
+    return float(output.decode().split()[-1])
+
+
+if __name__ == "__main__":
+    tmpdir = tempfile.mkdtemp()
+    try:
+        create_package(tmpdir)
+        # First run compiles the bytecode caches, then the runs are
+        # interleaved and the best times kept
+        import_time(tmpdir, "")
+        reference, hooked = [], []
+        for _ in range(NB_RUNS):
+            reference.append(import_time(tmpdir, ""))
+            hooked.append(import_time(tmpdir, BREDALA_SETUP))
+        reference, hooked = min(reference), min(hooked)
+    finally:
+        shutil.rmtree(tmpdir)
+    print("{0} imports without bredala: {1:.1f}ms".format(
+        NB_MODULES, reference * 1e3))
+    print("{0} imports with bredala:    {1:.1f}ms ({2:+.1f}%)".format(
+        NB_MODULES, hooked * 1e3, (hooked - reference) * 100. / reference))
+
+    hook = BredalaMetaImportHook()
+    print("unregistered module lookup: {0:.0f}ns (cached {1:.0f}ns)".format(
+        *lookup_times(hook)))
+    for index in range(100):
+        bredala.register("pkg{0}.**".format(index), names=["*Loader.load*"])
+        bredala.register("pkg{0}.sub*.io".format(index))
+    print("unregistered module lookup with 200 patterns: {0:.0f}ns "
+          "(cached {1:.0f}ns)".format(*lookup_times(hook)))
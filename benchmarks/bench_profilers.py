@@ -0,0 +1,58 @@
+"""
+Line profiler backends overhead
+===============================
+
+Credit: A Grigis
+
+Micro-benchmark of the line profiler backends on a function that calls
+pure-python helpers: the 'deterministic' backend traces every line of every
+executed file while the 'targeted' backend only records the line events of
+the decorated function code::
+
+    python benchmarks/bench_profilers.py
+"""
+
+# System import
+import timeit
+
+# Bredala import
+from bredala.profilers import get_profiler
+
+
+def helper(value):
+    """ A pure-python helper.
+    """
+    total = 0
+    for index in range(10):
+        total += index * value
+    return total
+
+
+def pipeline(size):
+    """ The function to be profiled.
+    """
+    result = 0
+    for value in range(size):
+        result += helper(value)
+    return result
+
+
+def bench(backend, number):
+    """ Return the best per-call time of a profiled call in microseconds.
+    """
+    if backend is None:
+        timer = timeit.Timer(lambda: pipeline(100))
+    else:
+        factory = get_profiler(backend)
+        codes = frozenset([pipeline.__code__])
+        timer = timeit.Timer(
+            lambda: factory(codes).runcall(pipeline, 100))
+    best = min(timer.repeat(repeat=5, number=number))
+    return best / number * 1e6
+
+
+if __name__ == "__main__":
+    number = 100
+    for backend in (None, "targeted", "deterministic"):
+        print("{0:<20}{1:>10.1f} us/call".format(
+            backend or "no profiler", bench(backend, number)))
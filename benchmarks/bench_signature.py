@@ -0,0 +1,87 @@
+"""
+Signature per-call overhead
+===========================
+
+Credit: A Grigis
+
+Micro-benchmark of the per-call cost of the @bredala_signature decorator.
+The former implementation introspected the decorated object on every call
+(argspec, defaults and 'self'/'cls' positions); it is reproduced here as
+'legacy' and compared to the binding plan now computed once at decoration
+time. Output is sent to a null stream so that only the bredala overhead is
+measured::
+
+    python benchmarks/bench_signature.py
+"""
+
+# System import
+import os
+import sys
+import inspect
+import timeit
+
+# Bredala import
+from bredala.signaturedecorator import BindingPlan
+from bredala.signaturedecorator import bredala_signature
+from bredala.signaturedecorator import object_repr
+from bredala.demo.myfunctions import mytype
+
+
+def legacy_signature(obj, args, kwargs, is_method=False):
+    """ The per-call signature computation used before the binding plan.
+    """
+    arg_spec = inspect.getfullargspec(obj)
+    defaults = [repr(item) for item in arg_spec.defaults or []]
+    optional = dict(zip(reversed(arg_spec.args or []), reversed(defaults)))
+    for name, value in kwargs.items():
+        if name in optional:
+            optional[name] = object_repr(value)
+    mandatory = []
+    self_parameter = None
+    for index in range(len(arg_spec.args) - len(optional)):
+        if index < len(args):
+            value = args[index]
+        else:
+            value = kwargs[arg_spec.args[index]]
+        if arg_spec.args[index] == "self":
+            self_parameter = value
+        mandatory.append((arg_spec.args[index], object_repr(value)))
+    params = ["{0}={1}".format(name, val) for name, val in mandatory]
+    params.extend([
+        "{0}={1}".format(name, val) for name, val in optional.items()])
+    signature = "{0}({1})".format(obj.__name__, ", ".join(params))
+    module = obj.__module__
+    package_name = module.split(".")[0]
+    if is_method:
+        obj_name = (module + "." + self_parameter.__class__.__name__ +
+                    "." + obj.__name__)
+    else:
+        obj_name = module + "." + obj.__name__
+    return package_name, obj_name, signature
+
+
+def bench(stmt, number):
+    """ Return the best per-call time of a statement in nanoseconds.
+    """
+    timer = timeit.Timer(stmt)
+    best = min(timer.repeat(repeat=5, number=number))
+    return best / number * 1e9
+
+
+if __name__ == "__main__":
+    number = 20000
+    plan = BindingPlan(mytype)
+    wrapper = bredala_signature(mytype, use_profiler=False)
+    results = [
+        ("bare call", bench(lambda: mytype(1.), number)),
+        ("legacy binding", bench(
+            lambda: legacy_signature(mytype, (1., ), {}), number)),
+        ("plan binding", bench(
+            lambda: (plan.signature((1., ), {}), plan.qualified_name()),
+            number))]
+    stdout = sys.stdout
+    with open(os.devnull, "w") as sys.stdout:
+        results.append(("decorated call", bench(lambda: wrapper(1.), number)))
+    sys.stdout = stdout
+    for name, duration in results:
+        print("{0:<20}{1:>10.0f} ns/call".format(name, duration))
@@ -0,0 +1,61 @@
+"""
+Disabled instrumentation per-call cost
+======================================
+
+Credit: A Grigis
+
+Micro-benchmark of the per-call cost of a decorated function when the
+instrumentation is disabled at runtime with 'bredala.disable'. The function
+is called through its module attribute and through the reference imported
+by another module after the decoration, ie. with a 'from module import
+function': both are the original function again. It is also called through
+a reference to the wrapper kept elsewhere, eg. in a callback, that only
+adds a flag check before the direct call. The enabled wrapper with the 'off'
+verbosity level is given as a reference::
+
+    python benchmarks/bench_toggle.py
+"""
+
+# System import
+import sys
+import types
+import timeit
+
+# Bredala import
+import bredala
+import bredala.demo.myfunctions as myfunctions
+
+
+def bench(stmt, number):
+    """ Return the best per-call time of a statement in nanoseconds.
+    """
+    timer = timeit.Timer(stmt)
+    best = min(timer.repeat(repeat=5, number=number))
+    return best / number * 1e9
+
+
+if __name__ == "__main__":
+    number = 200000
+    reference = bench(lambda: myfunctions.addition(1, 2), number)
+    bredala.attach("bredala.demo.myfunctions", names=["addition"],
+                   verbosity="off")
+    user = types.ModuleType("benchuser")
+    sys.modules[user.__name__] = user
+    exec("from bredala.demo.myfunctions import addition", user.__dict__)
+    callbacks = [myfunctions.addition]
+    results = [("enabled, off verbosity",
+                bench(lambda: myfunctions.addition(1, 2), number))]
+    bredala.disable()
+    results.extend([
+        ("disabled, module attribute",
+         bench(lambda: myfunctions.addition(1, 2), number)),
+        ("disabled, imported reference",
+         bench(lambda: user.addition(1, 2), number)),
+        ("disabled, held wrapper",
+         bench(lambda: callbacks[0](1, 2), number))])
+    bredala.enable()
+    bredala.detach("bredala.demo.myfunctions")
+    print("{0:<30}{1:>10.0f} ns/call".format("bare call", reference))
+    for name, duration in results:
+        print("{0:<30}{1:>10.0f} ns/call ({2:+.0f} ns)".format(
+            name, duration, duration - reference))
@@ -0,0 +1,95 @@
+"""
+Type checking per-call overhead
+===============================
+
+Credit: A Grigis
+
+Micro-benchmark of the per-call cost of the @inputs/@returns type checking
+decorators. The former generic implementation, that looped over the
+arguments and scanned the builtin types list on every call, is reproduced
+here as 'legacy' and compared to the generated specialized validators::
+
+    python benchmarks/bench_typedecorator.py
+"""
+
+# System import
+import timeit
+
+# Bredala import
+from bredala.typedecorator import TYPES
+from bredala.typedecorator import inputs
+from bredala.typedecorator import returns
+
+
+def legacy_inputs(*accepted_arg_types):
+    """ The generic inputs decorator used before the validators compiler.
+    """
+    def input_decorator(validate_function):
+        def decorator_wrapper(*function_args, **function_args_dict):
+            nb_args = len(function_args) + len(function_args_dict)
+            if len(accepted_arg_types) != nb_args:
+                raise ValueError(validate_function.__name__)
+            for arg_num, (actual_arg, accepted_arg_type) in enumerate(
+                    zip(function_args, accepted_arg_types)):
+                if accepted_arg_type in ("self", "cls"):
+                    continue
+                if accepted_arg_type not in TYPES:
+                    raise ValueError(accepted_arg_type)
+                if type(actual_arg) is not accepted_arg_type:
+                    raise ValueError(arg_num)
+            return validate_function(*function_args, **function_args_dict)
+        return decorator_wrapper
+    return input_decorator
+
+
+def legacy_returns(*accepted_return_type_tuple):
+    """ The generic returns decorator used before the validators compiler.
+    """
+    def return_decorator(validate_function):
+        def decorator_wrapper(*function_args, **function_args_dict):
+            return_values = validate_function(
+                *function_args, **function_args_dict)
+            flatten = False
+            if not isinstance(return_values, tuple):
+                flatten = True
+                return_values = (return_values, )
+            if len(return_values) != len(accepted_return_type_tuple):
+                raise ValueError(validate_function.__name__)
+            for arg_num, (return_value, accepted_return_type) in enumerate(
+                    zip(return_values, accepted_return_type_tuple)):
+                if accepted_return_type not in TYPES:
+                    raise ValueError(accepted_return_type)
+                if type(return_value) is not accepted_return_type:
+                    raise ValueError(arg_num)
+            if flatten:
+                return_values = return_values[0]
+            return return_values
+        return decorator_wrapper
+    return return_decorator
+
+
+def volume(width, height, depth):
+    """ The function to be checked.
+    """
+    return width * height * depth
+
+
+def bench(func, number):
+    """ Return the best per-call time of a function in nanoseconds.
+    """
+    timer = timeit.Timer(lambda: func(1., 2., 3.))
+    best = min(timer.repeat(repeat=5, number=number))
+    return best / number * 1e9
+
+
+if __name__ == "__main__":
+    number = 100000
+    types = (float, float, float)
+    results = [
+        ("bare call", bench(volume, number)),
+        ("legacy checks", bench(
+            legacy_returns(float)(legacy_inputs(*types)(volume)), number)),
+        ("compiled checks", bench(
+            returns(float)(inputs(*types)(volume)), number))]
+    for name, duration in results:
+        print("{0:<20}{1:>10.0f} ns/call".format(name, duration))
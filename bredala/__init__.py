@@ -12,11 +12,42 @@ Easy to use pure-python caller signature and line-profiler.
 
 # Bredala globals
 USE_PROFILER = True
+USE_AGGREGATION = False
+VERBOSITY = None
+PROFILER_BACKEND = "targeted"
+REPR_MAX_DEPTH = 3
+REPR_MAX_ITEMS = 10
+REPR_MAX_CHARS = 1000
+REPR_ARRAY_STATS = False
 _modules = {}
+_patterns = None
 _hackers = []
+_stats = {}
+_edges = {}
+_buffers = []
+_profiles = {}
+_codes = set()
+_patches = []
+_sink = None
+_process_stats = None
+_calibration = None
+_enabled = True
 
 # Bredala import
 from .info import __version__
+from .calibration import calibrate
 from .modulehacker import register
+from .modulehacker import attach
+from .modulehacker import detach
+from .modulehacker import enable
+from .modulehacker import disable
+from .modulehacker import is_enabled
 from .modulehacker import itype
 from .modulehacker import otype
+from .stats import report
+from .processes import enable_process_stats
+from .sinks import set_sink
+from .sinks import StreamSink
+from .sinks import ThreadedSink
+from .sinks import TraceSink
+from .sinks import ChromeTraceSink
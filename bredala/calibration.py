@@ -0,0 +1,125 @@
+##########################################################################
+# Bredala - Copyright (C) AGrigis, 2015
+# Distributed under the terms of the CeCILL-B license, as published by
+# the CEA-CNRS-INRIA. Refer to the LICENSE file or to
+# http://www.cecill.info/licences/Licence_CeCILL-B_V1-en.html
+# for details.
+##########################################################################
+
+"""
+Module that calibrates the cost of the decorated calls timing.
+
+The timed section of a decorated call also measures the clock reads and the
+call of the decorated object by the wrapper. This overhead is measured at
+startup on an empty function and subtracted from the recorded durations.
+The spread of these measurements gives the noise floor under which a
+duration cannot be told apart from the timing overhead.
+"""
+
+
+# System import
+import time
+from time import perf_counter_ns
+
+# Bredala import
+import bredala
+
+
+class Calibration(object):
+    """ The measured cost of the decorated calls timing.
+    """
+    def __init__(self, overhead=0, noise_floor=0):
+        """ Initialize the Calibration class.
+
+        Parameters
+        ----------
+        overhead: int (optional, default 0)
+            the timing overhead subtracted from the recorded durations in
+            nanoseconds.
+        noise_floor: int (optional, default 0)
+            the corrected durations below this time in nanoseconds are within
+            the measurement noise.
+        """
+        self.overhead = overhead
+        self.noise_floor = noise_floor
+
+    def correct(self, start, end):
+        """ Subtract the timing overhead from a call end time.
+
+        Parameters
+        ----------
+        start, end: int (mandatory)
+            the measured call start and end 'perf_counter_ns' times.
+
+        Returns
+        -------
+        end: int
+            the corrected call end time, not before the start time.
+        """
+        return max(end - self.overhead, start)
+
+    def is_noise(self, duration):
+        """ Check if a corrected duration is within the noise floor.
+
+        Parameters
+        ----------
+        duration: float (mandatory)
+            a corrected duration in seconds.
+
+        Returns
+        -------
+        is_noise: bool
+            True if the duration is within the noise floor.
+        """
+        return duration * 1e9 < self.noise_floor
+
+
+def _empty(*args, **kwargs):
+    """ The empty function timed during the calibration.
+    """
+
+
+def _timed_call(args, kwargs):
+    """ Time an empty function call like the decorated calls are timed.
+    """
+    start = perf_counter_ns()
+    try:
+        _empty(*args, **kwargs)
+    finally:
+        end = perf_counter_ns()
+    return end - start
+
+
+def calibrate(number=2000):
+    """ Measure the timing overhead of the decorated calls.
+
+    Parameters
+    ----------
+    number: int (optional, default 2000)
+        the number of timed empty calls, 0 to disable the correction of the
+        recorded durations.
+
+    Returns
+    -------
+    calibration: Calibration
+        the measured timing overhead and noise floor, also used for the next
+        decorated calls.
+    """
+    if number <= 0:
+        bredala._calibration = Calibration()
+        return bredala._calibration
+    args, kwargs = (1, 2), {}
+    for _ in range(number // 10):
+        _timed_call(args, kwargs)
+    durations = sorted(
+        [_timed_call(args, kwargs) for _ in range(number)])
+    overhead = durations[len(durations) // 2]
+    noise_floor = durations[int(len(durations) * 0.95)] - overhead
+    resolution = int(time.get_clock_info("perf_counter").resolution * 1e9)
+    noise_floor = max(noise_floor, resolution)
+    bredala._calibration = Calibration(overhead, noise_floor)
+    return bredala._calibration
+
+
+# Calibrate at startup
+calibrate()
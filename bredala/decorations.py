@@ -12,12 +12,14 @@ Module that sets the package decoration functions dynamically.
 
 
 # System import
-import sys
 import inspect
 import types
 
 # Bredala import
 import bredala
+from .typedecorator import compose
+from .registry import get_decorators
+from .registry import get_object_decorators
 
 
 class Decorations(object):
@@ -42,7 +44,7 @@ class Decorations(object):
             the input python module object.
         """
         # If a decorator is decalred for the module apply it now
-        decorators_struct = bredala._modules.get(name)
+        decorators_struct = get_decorators(name)
         if decorators_struct is not None:
             self.decorate(module, name, decorators_struct)
         return module
@@ -58,59 +60,50 @@ class Decorations(object):
         name: str (mandatory)
             the name of the input module.
         decorators_struct: dict of dict
-            a dictionary with the functions/methods to be decorated as first
-            keys, the decorator type as second keys and the decorator -
-            decorator parameters as values.
+            a dictionary with the functions/methods to be decorated, or
+            shell-style patterns, as first keys, the decorator type as second
+            keys and the decorator - decorator parameters as values.
         """
-        # Create a class mapping
-        mapping = {}
-        for filter_name in decorators_struct:
-            kname, mname = Decorations.split_class(filter_name)
-            mapping.setdefault(kname, []).append(mname)
+        # The attributes already decorated, eg. by the import hook or by a
+        # previous attach, are skipped
+        patched = set((id(patch.owner), patch.attr)
+                      for patch in bredala._patches)
+
+        def is_decorated(owner, attr, obj):
+            return (getattr(obj, "switch", None) is not None or
+                    (id(owner), attr) in patched)
 
         # Walk on all the module items
-        for module_attr, module_object in module.__dict__.items():
+        for module_attr, module_object in list(module.__dict__.items()):
 
             # Function case
             if isinstance(module_object, types.FunctionType):
-                if "ALL" in decorators_struct:
-                    key = "ALL"
-                elif module_object.__name__ in decorators_struct:
-                    key = module_object.__name__
-                else:
+                decorator_struct = get_object_decorators(
+                    decorators_struct, module_object.__name__)
+                if (decorator_struct is None or
+                        is_decorated(module, module_attr, module_object)):
                     continue
                 Decorations._decorate(module, module_attr, module_object,
-                                      decorators_struct[key])
+                                      decorator_struct, module_name=name)
 
             # Class case
             elif inspect.isclass(module_object):
-                if "ALL" in mapping:
-                    allowed_methods = "ALL"
-                elif module_object.__name__ in mapping:
-                    allowed_methods = mapping[module_object.__name__]
-                else:
-                    continue
-                if sys.version_info[:2] >= (3, 0):
-                    methods = inspect.getmembers(
-                        module_object, predicate=inspect.isfunction)
-                else:
-                    methods = inspect.getmembers(
-                        module_object, predicate=inspect.ismethod)
+                methods = inspect.getmembers(
+                    module_object, predicate=inspect.isfunction)
                 for method_name, method in methods:
-                    if allowed_methods == "ALL":
-                        decorator_struct = decorators_struct["ALL"]
-                    elif method_name in allowed_methods:
-                        decorator_struct = decorators_struct["{0}.{1}".format(
-                            module_object.__name__, method_name)]
-                    else:
+                    decorator_struct = get_object_decorators(
+                        decorators_struct, "{0}.{1}".format(
+                            module_object.__name__, method_name))
+                    if (decorator_struct is None or
+                            is_decorated(module_object, method_name, method)):
                         continue
                     Decorations._decorate(
                         module_object, method_name, method, decorator_struct,
-                        is_method=True)
+                        is_method=True, module_name=name)
 
     @classmethod
     def _decorate(cls, module, module_attr, module_object, decorator_struct,
-                  is_method=False):
+                  is_method=False, module_name=None):
         """ Method that decorates a specific function or class method.
 
         Parameters
@@ -126,7 +119,13 @@ class Decorations(object):
             decorator parameters as values.
         is_method: bool (optional, default False)
             True if the module object is a method of a class, False otherwise.
+        module_name: str (optional, default None)
+            the name of the decorated module, default to the module object
+            '__module__' attribute.
         """
+        if module_name is None:
+            module_name = module_object.__module__
+
         # Get the declared type decorators
         type_decorators = []
         for key in ("inputs", "outputs"):
@@ -136,19 +135,25 @@ class Decorations(object):
             registered_types = decorator_struct[key]["types"]
             type_decorators.append((decorator, registered_types))
 
-        # Apply decorators
+        # Apply decorators: the type decorators chain is composed once here
+        # and reused on every call
         if "signature" in decorator_struct:
-            decorator = decorator_struct["signature"]["decorator"]
-            setattr(module, module_attr, decorator(
-                module_object,
-                use_profiler=bredala.USE_PROFILER,
-                is_method=is_method,
-                type_decorators=type_decorators))
-        else:
-            for decorator, registered_types in type_decorators:
-                setattr(module, module_attr,
-                        decorator(*registered_types)(module_object))
-                module_object = getattr(module, module_attr)
+            options = dict(decorator_struct["signature"])
+            decorator = options.pop("decorator")
+            options.setdefault("use_profiler", bredala.USE_PROFILER)
+            options.setdefault("aggregate", bredala.USE_AGGREGATION)
+            options.setdefault("profiler_backend", bredala.PROFILER_BACKEND)
+            options.setdefault("verbosity", bredala.VERBOSITY)
+            bredala._patches.append(Patch(
+                module_name, module, module_attr, decorator(
+                    module_object,
+                    is_method=is_method,
+                    type_decorators=type_decorators,
+                    **options)))
+        elif len(type_decorators) > 0:
+            bredala._patches.append(Patch(
+                module_name, module, module_attr,
+                compose(module_object, type_decorators)))
 
     @classmethod
     def split_class(cls, name):
@@ -177,3 +182,76 @@ class Decorations(object):
             kname = name
             mname = None
         return kname, mname
+
+
+class Patch(object):
+    """ A decorated module or class attribute that can be restored.
+    """
+    __slots__ = ("module_name", "owner", "attr", "original", "owned",
+                 "decorated")
+
+    def __init__(self, module_name, owner, attr, decorated):
+        """ Initialize the Patch class: the attribute is replaced by its
+        decorated version.
+
+        Parameters
+        ----------
+        module_name: str (mandatory)
+            the name of the decorated module.
+        owner: object (mandatory)
+            the module or class that owns the attribute.
+        attr: str (mandatory)
+            the attribute name.
+        decorated: object (mandatory)
+            the decorated attribute.
+        """
+        self.module_name = module_name
+        self.owner = owner
+        self.attr = attr
+        self.owned = attr in vars(owner)
+        self.original = vars(owner).get(attr)
+        self.decorated = decorated
+        setattr(owner, attr, decorated)
+
+    def restore(self):
+        """ Restore the original attribute, unless the attribute has been
+        replaced in the meantime. Inherited class methods are deleted from
+        the subclass.
+
+        Returns
+        -------
+        restored: bool
+            True if the original attribute has been restored.
+        """
+        if vars(self.owner).get(self.attr) is not self.decorated:
+            return False
+        if self.owned:
+            setattr(self.owner, self.attr, self.original)
+        else:
+            delattr(self.owner, self.attr)
+        return True
+
+    def switch(self, active):
+        """ Set the decorated or the original attribute, unless the attribute
+        has been replaced in the meantime.
+
+        Parameters
+        ----------
+        active: bool (mandatory)
+            if True set the decorated attribute, otherwise restore the
+            original one.
+
+        Returns
+        -------
+        switched: bool
+            True if the requested attribute is set.
+        """
+        if not active:
+            return self.restore()
+        current = vars(self.owner).get(self.attr)
+        if current is self.decorated:
+            return True
+        if current is not self.original:
+            return False
+        setattr(self.owner, self.attr, self.decorated)
+        return True
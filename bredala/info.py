@@ -20,8 +20,14 @@ CLASSIFIERS = [
     ("License :: OSI Approved :: GNU General Public License v2 or later "
      "(GPLv2+)"),
     "Operating System :: OS Independent",
-    "Programming Language :: Python :: 2.7",
     "Programming Language :: Python :: 3",
+    "Programming Language :: Python :: 3 :: Only",
+    "Programming Language :: Python :: 3.7",
+    "Programming Language :: Python :: 3.8",
+    "Programming Language :: Python :: 3.9",
+    "Programming Language :: Python :: 3.10",
+    "Programming Language :: Python :: 3.11",
+    "Programming Language :: Python :: 3.12",
     "Topic :: Software Development"]
 
 # Project descriptions
@@ -69,6 +75,7 @@ PLATFORMS = "OS Independent"
 ISRELEASE = True
 VERSION = __version__
 PROVIDES = ["bredala"]
+PYTHON_REQUIRES = ">=3.7"
 REQUIRES = [
     "numpy>=1.11.0",
     "pprofile>=1.6"
@@ -9,21 +9,32 @@
 ##########################################################################
 
 """
-Module that implements the New Import Hooks' PEP0302.
+Module that implements the New Import Hooks' PEP0302, based on the
+importlib meta path finders and loaders (PEP0451).
 """
 
 
 # System import
 import sys
-import os
 import inspect
-import imp
+import threading
+from importlib.abc import Loader
+from importlib.abc import MetaPathFinder
 
 # Bredala import
 import bredala
 from .signaturedecorator import bredala_signature
 from .typedecorator import inputs, returns
+from .typedecorator import check_types
 from .decorations import Decorations
+from .decorations import Patch
+from .registry import is_pattern
+from .registry import compile_pattern
+from .registry import ModuleTrie
+
+
+# Serialize the registrations made by concurrent threads
+_lock = threading.Lock()
 
 
 def register(module, decorator=bredala_signature, names=None,
@@ -33,29 +44,39 @@ def register(module, decorator=bredala_signature, names=None,
     Parameters
     ----------
     module: str (mandatory)
-        a module name whose functions will be decorated.
+        a module name whose functions will be decorated, or a module
+        pattern: the components may contain shell-style wildcards and the
+        last one may be '**' to match all the descendant modules, eg.
+        'mypkg.*' or 'mypkg.**'.
     decorator: callable (optional, default  @bredala_signature)
         a decorator function.
     names: list of str (optional, default None)
-        a list of function or methods we want to decorate, if None all the
+        a list of function or methods we want to decorate, possibly
+        shell-style patterns, eg. '*Loader.load*', if None all the
         module functions or methods will be decorated.
     decorator_type: str
         the decorator type. Supported values are 'signature', 'inputs' and
         'outputs'.
     kwargs: dict (optional)
-        extra arguments used during the dynamic decorations: 'istype' and
-        'types'.
+        extra arguments used during the dynamic decorations: 'types' for the
+        type decorators, the signature decorator options otherwise, eg.
+        'use_profiler', 'aggregate', 'profiler_backend' or 'verbosity' that
+        default to the 'USE_PROFILER', 'USE_AGGREGATION', 'PROFILER_BACKEND'
+        and 'VERBOSITY' globals.
     """
     if decorator_type not in ("signature", "inputs", "outputs"):
         raise ValueError("'{0}' decorator type not recognized.".format(
             decorator_type))
-    if module not in bredala._modules:
-        bredala._modules[module] = {}
     if names is None:
         names = ["ALL"]
-    for name in names:
-        kwargs["decorator"] = decorator
-        bredala._modules[module].setdefault(name, {})[decorator_type] = kwargs
+    kwargs["decorator"] = decorator
+    with _lock:
+        if is_pattern(module):
+            module_names = bredala._patterns.setdefault(module, {})
+        else:
+            module_names = bredala._modules.setdefault(module, {})
+        for name in names:
+            module_names.setdefault(name, {})[decorator_type] = kwargs
 
 
 def itype(module, name, input_types, decorator=inputs):
@@ -72,6 +93,8 @@ def itype(module, name, input_types, decorator=inputs):
     decorator: callable (optional, default @inputs)
         a decorator function.
     """
+    if decorator is inputs:
+        check_types(input_types, special_types=("self", "cls"))
     register(module, decorator=decorator, names=[name],
              decorator_type="inputs", types=input_types)
 
@@ -90,79 +113,310 @@ def otype(module, name, output_types, decorator=returns):
     decorator: callable (optional, default @returns)
         a decorator function.
     """
+    if decorator is returns:
+        check_types(output_types)
     register(module, decorator=decorator, names=[name],
              decorator_type="outputs", types=output_types)
 
 
+def attach(module, decorator=bredala_signature, names=None,
+           decorator_type="signature", **kwargs):
+    """ Function to register a decorator for a list of module names and to
+    decorate the matching modules that are already imported.
+
+    The references to the decorated functions held by the global namespace
+    of the other imported modules, eg. after a 'from module import
+    function', are also replaced.
+
+    Parameters
+    ----------
+    module: str (mandatory)
+        a module name or pattern whose functions will be decorated.
+    decorator: callable (optional, default  @bredala_signature)
+        a decorator function.
+    names: list of str (optional, default None)
+        a list of function or methods we want to decorate, if None all the
+        module functions or methods will be decorated.
+    decorator_type: str
+        the decorator type. Supported values are 'signature', 'inputs' and
+        'outputs'.
+    kwargs: dict (optional)
+        extra arguments used during the dynamic decorations (see register).
+    """
+    register(module, decorator=decorator, names=names,
+             decorator_type=decorator_type, **kwargs)
+
+    # Decorate the imported modules
+    matches = module_matcher(module)
+    first_patch = len(bredala._patches)
+    for name, module_object in list(sys.modules.items()):
+        if module_object is None or not matches(name):
+            continue
+        for hacker in bredala._hackers:
+            hacker.hack(module_object, name)
+    new_patches = [patch for patch in bredala._patches[first_patch:]
+                   if inspect.ismodule(patch.owner)]
+
+    # Replace the references held by the other modules
+    track_references(new_patches, "original")
+
+
+def detach(module=None):
+    """ Function to unregister the decorators of a module name or pattern
+    and to restore the original functions/methods of the imported modules.
+
+    Parameters
+    ----------
+    module: str (optional, default None)
+        a module name or pattern registered with 'register' or 'attach', if
+        None all the registrations are removed.
+    """
+    with _lock:
+        if module is None:
+            bredala._modules.clear()
+            for pattern in list(bredala._patterns.patterns):
+                bredala._patterns.remove(pattern)
+            matches = None
+        else:
+            if is_pattern(module):
+                bredala._patterns.remove(module)
+            else:
+                bredala._modules.pop(module, None)
+            matches = module_matcher(module)
+        kept_patches = []
+        for patch in reversed(bredala._patches):
+            if matches is None or matches(patch.module_name):
+                patch.restore()
+            else:
+                kept_patches.append(patch)
+        bredala._patches[:] = reversed(kept_patches)
+
+
+def enable(names=None):
+    """ Function to enable the instrumentation of the decorated
+    functions/methods at runtime.
+
+    Parameters
+    ----------
+    names: str or list of str (optional, default None)
+        the qualified names or shell-style patterns of the decorated
+        functions/methods, eg. 'mymodule.MyClass.*', if None the global
+        flag is set (see is_enabled).
+    """
+    _set_enabled(True, names)
+
+
+def disable(names=None):
+    """ Function to disable the instrumentation of the decorated
+    functions/methods at runtime.
+
+    The original functions/methods are set back in their modules and
+    classes, so that their calls have no overhead. The references to the
+    wrappers held elsewhere, eg. in callbacks or after a 'from module import
+    function', call the original objects after a single flag check.
+
+    Parameters
+    ----------
+    names: str or list of str (optional, default None)
+        the qualified names or shell-style patterns of the decorated
+        functions/methods, eg. 'mymodule.MyClass.*', if None the global
+        flag is unset (see is_enabled).
+    """
+    _set_enabled(False, names)
+
+
+def is_enabled():
+    """ Function to check the global instrumentation flag set with enable
+    and disable.
+
+    Returns
+    -------
+    enabled: bool
+        True if the instrumentation is globally enabled.
+    """
+    return bredala._enabled
+
+
+def _set_enabled(enabled, names):
+    """ Set the global or the matching wrappers instrumentation flag, and
+    switch the decorated attributes accordingly.
+    """
+    with _lock:
+        switches = list(bredala._switches)
+        inactive = set(switch for switch in switches if not switch.active)
+        if names is None:
+            bredala._enabled = enabled
+        else:
+            if not isinstance(names, (list, tuple)):
+                names = [names]
+            regexes = [compile_pattern(name) for name in names]
+            for switch in switches:
+                if any(regex.match(switch.name) for regex in regexes):
+                    switch.enabled = enabled
+        for switch in switches:
+            switch.update()
+
+        # Restore the inactive patches from the last one, so that stacked
+        # decorations are unwound, then set the active ones: the references
+        # to the inactive wrappers held by the other modules are also
+        # restored
+        patches = [patch for patch in bredala._patches
+                   if getattr(patch.decorated, "switch", None) is not None]
+        track_references([patch for patch in patches
+                          if not patch.decorated.switch.active], "decorated")
+        patches = [patch for patch in bredala._patches
+                   if getattr(patch.decorated, "switch", None) is not None]
+        for patch in reversed(patches):
+            if not patch.decorated.switch.active:
+                patch.switch(False)
+        for patch in patches:
+            if patch.decorated.switch.active:
+                patch.switch(True)
+
+        # Decorate the references to the original objects imported by the
+        # other modules while the reactivated patches were inactive
+        track_references([patch for patch in patches
+                          if patch.decorated.switch in inactive and
+                          patch.decorated.switch.active], "original")
+
+
+def track_references(patches, held):
+    """ Function to track the references to the patched functions held by
+    the global namespace of the imported modules, eg. after a 'from module
+    import function'.
+
+    Parameters
+    ----------
+    patches: list of Patch (mandatory)
+        the patches of the decorated functions.
+    held: str (mandatory)
+        'original' to decorate the references to the original functions,
+        'decorated' to track the references to the decorated functions so
+        that they are switched like the patched attributes.
+    """
+    references = dict(
+        (id(getattr(patch, held)), patch) for patch in patches
+        if inspect.ismodule(patch.owner))
+    if len(references) == 0:
+        return
+    tracked = set((id(patch.owner), patch.attr) for patch in bredala._patches)
+    for module_object in list(sys.modules.values()):
+        namespace = getattr(module_object, "__dict__", None)
+        if not isinstance(namespace, dict):
+            continue
+        for attr, value in list(namespace.items()):
+            patch = references.get(id(value))
+            if (patch is None or value is not getattr(patch, held) or
+                    (id(module_object), attr) in tracked):
+                continue
+            namespace[attr] = patch.original
+            bredala._patches.append(Patch(
+                patch.module_name, module_object, attr, patch.decorated))
+            tracked.add((id(module_object), attr))
+
+
+def module_matcher(module):
+    """ Create a function that checks if a module name matches a registered
+    module name or pattern.
+
+    Parameters
+    ----------
+    module: str (mandatory)
+        a module name or pattern.
+
+    Returns
+    -------
+    matches: callable
+        a function that returns True if the input module name matches.
+    """
+    if not is_pattern(module):
+        return lambda name: name == module
+    trie = ModuleTrie()
+    trie.insert(module, True)
+    return lambda name: len(trie.match(name)) > 0
+
+
 def modulehacker_register(obj):
     """ A simple registery to define new hackers.
     """
     bredala._hackers.append(obj)
 
 
-class BredalaMetaImportHook(object):
-    """ A class that import a module like normal and then passed to a hacker
-    object that gets to do whatever it wants to the module. Then the return
-    value from the hack call is put into sys.modules.
+class BredalaMetaImportHook(MetaPathFinder):
+    """ A meta path finder that finds the registered modules with the other
+    finders and wraps their loaders: the modules are executed like normal
+    and then passed to the hacker objects that get to do whatever they want
+    to the modules.
+
+    The hook is shared by all the threads: the state of each import is kept
+    in a dedicated BredalaLoader instance.
     """
-    def __init__(self):
-        self.module = None
-
-    def find_module(self, name, path=None):
-        """ This method is called by Python if this class is on sys.path.
-        'name' is the fully-qualified name of the module to look for, and
-        'path' is either __path__ (for submodules and subpackages) or None (for
-        a top-level module/package).
-
-        Note that this method will be called every time an import statement
-        is detected (or __import__ is called), before Python's built-in
-        package/module-finding code kicks in.
+    def find_spec(self, fullname, path, target=None):
+        """ This method is called by Python for every import statement (or
+        __import__ call) before the built-in finders kick in. 'fullname' is
+        the fully-qualified name of the module to look for, and 'path' is
+        either __path__ (for submodules and subpackages) or None (for a
+        top-level module/package).
         """
         # Use this loader only on registered modules
-        if name not in bredala._modules:
+        if (fullname not in bredala._modules and
+                not bredala._patterns.match(fullname)):
             return None
 
-        # Get parent module and associated sub module names
-        self.sub_name = name.split(".")[-1]
-        self.mod_name = name.rpartition(".")[0]
-
-        # Find the sub module and build the module path
-        try:
-            self.file, self.filename, self.stuff = imp.find_module(
-                self.sub_name, path)
-            self.path = [self.filename]
-        except ImportError:
+        # Find the module with the other finders
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
             return None
 
-        # Return The loader, here the object itself
-        return self
+        # Wrap the module loader, namespace packages have no code to be
+        # decorated
+        if spec.loader is None or not hasattr(spec.loader, "exec_module"):
+            return spec
+        spec.loader = BredalaLoader(spec.loader)
+        return spec
 
-    def load_module(self, name):
-        """ This method is called by Python if BredalaImportHook 'find_module'
-         does not return None. 'name' is the fully-qualified name
-         of the module/package that was requested.
+
+class BredalaLoader(Loader):
+    """ A loader that executes a registered module with its original loader
+    and then passes it to the hackers.
+
+    The other loader attributes, eg. 'get_source' or 'get_code', are those
+    of the original loader.
+    """
+    def __init__(self, loader):
+        """ Initialize the BredalaLoader class.
+
+        Parameters
+        ----------
+        loader: Loader (mandatory)
+            the original module loader.
         """
-        # Load the module
-        module = imp.load_module(name, self.file, self.filename,
-                                 self.stuff)
-        if self.file:
-            self.file.close()
+        self.loader = loader
 
-        # Decorate the function/methods
-        for hacker in bredala._hackers:
-            module = hacker.hack(module, name)
-
-        # Update the module required information
-        module.__path__ = self.path
-        module.__loader__ = self
-        module.__package__ = name
-        module.__name__ = name
-        if self.stuff[0] == ".py":
-            module.__file__ = self.path[0]
-        else:
-            module.__file__ = os.path.join(self.path[0], "__init__.py")
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+    def create_module(self, spec):
+        """ Create the module with the original loader.
+        """
+        return self.loader.create_module(spec)
 
-        return module
+    def exec_module(self, module):
+        """ Execute the module with the original loader and decorate its
+        functions/methods.
+        """
+        self.loader.exec_module(module)
+        name = module.__spec__.name
+        hacked_module = module
+        for hacker in bredala._hackers:
+            hacked_module = hacker.hack(hacked_module, name)
+        if hacked_module is not module:
+            sys.modules[name] = hacked_module
 
 
 modulehacker_register(Decorations())
@@ -0,0 +1,183 @@
+##########################################################################
+# Bredala - Copyright (C) AGrigis, 2015
+# Distributed under the terms of the CeCILL-B license, as published by
+# the CEA-CNRS-INRIA. Refer to the LICENSE file or to
+# http://www.cecill.info/licences/Licence_CeCILL-B_V1-en.html
+# for details.
+##########################################################################
+
+"""
+Module that collects the aggregated statistics of the child processes.
+
+Each child process, started with 'multiprocessing' or
+'concurrent.futures.ProcessPoolExecutor', dumps its statistics in its own
+file when it exits. The parent process loads and removes these files when
+the report is displayed.
+"""
+
+
+# System import
+import os
+import glob
+import uuid
+import atexit
+import pickle
+import shutil
+import tempfile
+import multiprocessing
+from multiprocessing import util
+
+# Bredala import
+import bredala
+from .stats import StatsBuffer
+from .stats import collect
+
+
+# The environment variable that passes the statistics directory to the
+# spawned child processes
+STATS_DIR_ENV = "BREDALA_STATS_DIR"
+
+
+class ProcessStats(object):
+    """ The statistics files of a process tree.
+    """
+    def __init__(self, directory):
+        """ Initialize the ProcessStats class.
+
+        Parameters
+        ----------
+        directory: str (mandatory)
+            the directory of the child processes statistics files.
+        """
+        self.directory = directory
+        self.child = False
+        self.buffers = []
+        util.register_after_fork(self, ProcessStats.after_fork)
+        if is_child_process():
+            self.after_fork()
+
+    def after_fork(self):
+        """ Dump the statistics when the child process exits: the
+        multiprocessing workers may exit without running the 'atexit'
+        handlers. The child process report is displayed by the parent.
+        """
+        self.child = True
+        self.clear()
+        util.Finalize(None, self.dump, exitpriority=10)
+
+    def filename(self, pid, token):
+        """ The statistics file of a process.
+
+        Parameters
+        ----------
+        pid: int or str (mandatory)
+            a process identifier.
+        token: str (mandatory)
+            a unique token, so that a reused process identifier does not
+            overwrite the statistics of a previous process.
+
+        Returns
+        -------
+        filename: str
+            the process statistics file.
+        """
+        return os.path.join(self.directory, "bredala-{0}-{1}.pkl".format(
+            pid, token))
+
+    def dump(self):
+        """ Dump the current process statistics.
+        """
+        collect(processes=False)
+        if len(bredala._stats) == 0 and len(bredala._profiles) == 0:
+            return
+        stats_buffer = StatsBuffer()
+        stats_buffer.stats.update(bredala._stats)
+        stats_buffer.edges.update(bredala._edges)
+        stats_buffer.profiles.update(bredala._profiles)
+        filename = self.filename(os.getpid(), uuid.uuid4().hex)
+        tmp_filename = filename + ".tmp"
+        with open(tmp_filename, "wb") as open_file:
+            pickle.dump(stats_buffer, open_file, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp_filename, filename)
+
+    def load(self):
+        """ Load the statistics of the child processes.
+
+        The loaded files are removed and their statistics kept in memory.
+        The child processes do not load the statistics of the other
+        processes: they are collected by the parent process.
+
+        Returns
+        -------
+        buffers: list of StatsBuffer
+            the statistics of the processes that have dumped their
+            statistics.
+        """
+        if self.child:
+            return []
+        for filename in sorted(glob.glob(self.filename("*", "*"))):
+            with open(filename, "rb") as open_file:
+                self.buffers.append(pickle.load(open_file))
+            os.remove(filename)
+        return list(self.buffers)
+
+    def clear(self):
+        """ Clear the loaded statistics.
+        """
+        del self.buffers[:]
+
+    def cleanup(self):
+        """ Load the pending statistics files and remove the directory.
+        """
+        self.load()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def is_child_process():
+    """ Check if the current process has been started by 'multiprocessing'.
+
+    Returns
+    -------
+    is_child: bool
+        True if the current process is a 'multiprocessing' child process.
+    """
+    return multiprocessing.current_process().name != "MainProcess"
+
+
+def enable_process_stats(directory=None):
+    """ Collect the aggregated statistics of the child processes.
+
+    Only the child processes started after this call are collected: their
+    statistics are dumped when they exit normally, eg. after a
+    'Pool.close/join' or an executor shutdown, not after a 'Pool.terminate'.
+
+    Parameters
+    ----------
+    directory: str (optional, default None)
+        the directory of the child processes statistics files, a new
+        temporary directory removed at exit if None.
+
+    Returns
+    -------
+    directory: str
+        the directory of the child processes statistics files.
+    """
+    if directory is None:
+        directory = tempfile.mkdtemp(prefix="bredala-")
+        process_stats = ProcessStats(directory)
+        atexit.register(process_stats.cleanup)
+    else:
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        process_stats = ProcessStats(directory)
+    os.environ[STATS_DIR_ENV] = directory
+    bredala._process_stats = process_stats
+    return directory
+
+
+# Spawned child processes inherit the statistics directory from the
+# environment: the other processes started with this environment, eg. with
+# 'subprocess', are ignored
+if (os.environ.get(STATS_DIR_ENV) is not None and
+        bredala._process_stats is None and is_child_process()):
+    bredala._process_stats = ProcessStats(os.environ[STATS_DIR_ENV])
@@ -0,0 +1,590 @@
+##########################################################################
+# Bredala - Copyright (C) AGrigis, 2015
+# Distributed under the terms of the CeCILL-B license, as published by
+# the CEA-CNRS-INRIA. Refer to the LICENSE file or to
+# http://www.cecill.info/licences/Licence_CeCILL-B_V1-en.html
+# for details.
+##########################################################################
+
+"""
+Module that defines the line profiler backends.
+
+A backend is created with the code objects of interest, runs a call with its
+'runcall' method and then exposes the 'total_time' of the call and the
+per-line 'hit_stats' of a profiled file, identified by the 'co_filename' of
+its code objects.
+"""
+
+
+# System import
+import sys
+import time
+import threading
+from time import perf_counter
+from threading import get_ident
+import pprofile
+
+
+# The per-thread code objects accounted by the profiled call in progress
+_local = threading.local()
+
+
+class DeterministicProfiler(object):
+    """ A deterministic line profiler based on pprofile: every line event of
+    every executed file is traced.
+    """
+    estimated = False
+
+    def __init__(self, codes=None):
+        """ Initialize the DeterministicProfiler class.
+
+        Parameters
+        ----------
+        codes: set of code (optional, default None)
+            the code objects of interest, not used: all the code is traced.
+        """
+        self._profiler = pprofile.Profile()
+
+    def runcall(self, func, *args, **kwargs):
+        """ Profile a call.
+
+        Parameters
+        ----------
+        func: callable (mandatory)
+            the function to be profiled.
+        args, kwargs: (optional)
+            the function parameters.
+
+        Returns
+        -------
+        returncode: object
+            the function returned value.
+        """
+        return self._profiler.runcall(func, *args, **kwargs)
+
+    @property
+    def total_time(self):
+        """ The profiled call duration in seconds.
+        """
+        return self._profiler.total_time
+
+    def hit_stats(self, filename):
+        """ Get the line statistics of a profiled file.
+
+        Parameters
+        ----------
+        filename: str (mandatory)
+            the file name of the code of interest, ie. 'co_filename'.
+
+        Returns
+        -------
+        hit_stats: callable
+            a function that returns the number of hits and the duration of a
+            line number, None if the file has not been profiled.
+        """
+        # Since pprofile 2.0 the per-thread timings have to be merged first
+        if hasattr(self._profiler, "_mergeFileTiming"):
+            file_dict = self._profiler._mergeFileTiming()
+        else:
+            file_dict = self._profiler.file_dict
+        file_timing = file_dict.get(filename)
+        if file_timing is None:
+            return None
+        return file_timing.getHitStatsFor
+
+
+class SamplingThread(threading.Thread):
+    """ A daemon thread that records, at a fixed interval, the active frames
+    of the threads running a statistically profiled call.
+    """
+    def __init__(self, period):
+        """ Initialize the SamplingThread class.
+
+        Parameters
+        ----------
+        period: float (mandatory)
+            the sampling interval in seconds.
+        """
+        super(SamplingThread, self).__init__(name="bredala-sampler")
+        self.daemon = True
+        self.period = period
+        self.targets = {}
+        self._active = threading.Event()
+        self._lock = threading.Lock()
+
+    def add(self, ident, profiler):
+        """ Start sampling a thread.
+
+        Parameters
+        ----------
+        ident: int (mandatory)
+            the identifier of the profiled thread.
+        profiler: StatisticalProfiler (mandatory)
+            the profiler that collects the samples.
+        """
+        with self._lock:
+            self.targets.setdefault(ident, []).append(profiler)
+            self._active.set()
+
+    def remove(self, ident, profiler):
+        """ Stop sampling a thread.
+
+        Parameters
+        ----------
+        ident: int (mandatory)
+            the identifier of the profiled thread.
+        profiler: StatisticalProfiler (mandatory)
+            the profiler that collects the samples.
+        """
+        with self._lock:
+            profilers = self.targets[ident]
+            profilers.remove(profiler)
+            if len(profilers) == 0:
+                del self.targets[ident]
+            if len(self.targets) == 0:
+                self._active.clear()
+
+    def run(self):
+        """ Sample the active frames of the profiled threads.
+        """
+        while True:
+            self._active.wait()
+            time.sleep(self.period)
+            with self._lock:
+                frames = sys._current_frames()
+                for ident, profilers in self.targets.items():
+                    frame = frames.get(ident)
+                    if frame is None:
+                        continue
+                    for profiler in profilers:
+                        profiler.sample(frame)
+                frame = frames = None
+
+
+class StatisticalProfiler(object):
+    """ A low-overhead statistical line profiler: a shared sampling thread
+    records the active frame of the profiled thread at a fixed interval.
+
+    Each sample is attributed to every line of the call stack, up to the
+    profiled call, so that the time spent in callees is accounted to the
+    calling line. The line durations are estimated from the number of
+    samples.
+    """
+    estimated = True
+    _threads = {}
+    _lock = threading.Lock()
+
+    def __init__(self, codes=None, period=0.001):
+        """ Initialize the StatisticalProfiler class.
+
+        Parameters
+        ----------
+        codes: set of code (optional, default None)
+            the code objects of interest, not used: all the code is sampled.
+        period: float (optional, default 0.001)
+            the sampling interval in seconds.
+        """
+        self.period = period
+        self.samples = 0
+        self.total_time = 0
+        self._line_dict = {}
+        self._stop_frame = None
+
+    @classmethod
+    def sampling_thread(cls, period):
+        """ Get the shared sampling thread for a given interval.
+
+        Parameters
+        ----------
+        period: float (mandatory)
+            the sampling interval in seconds.
+
+        Returns
+        -------
+        thread: SamplingThread
+            the started sampling thread.
+        """
+        with cls._lock:
+            thread = cls._threads.get(period)
+            if thread is None:
+                thread = cls._threads[period] = SamplingThread(period)
+                thread.start()
+        return thread
+
+    def sample(self, frame):
+        """ Record a sample.
+
+        Parameters
+        ----------
+        frame: frame (mandatory)
+            the active frame of the profiled thread.
+        """
+        self.samples += 1
+        seen = set()
+        while frame is not None and frame is not self._stop_frame:
+            key = (frame.f_code.co_filename, frame.f_lineno)
+            if key not in seen:
+                seen.add(key)
+                lines = self._line_dict.setdefault(key[0], {})
+                lines[key[1]] = lines.get(key[1], 0) + 1
+            frame = frame.f_back
+
+    def runcall(self, func, *args, **kwargs):
+        """ Profile a call.
+
+        Parameters
+        ----------
+        func: callable (mandatory)
+            the function to be profiled.
+        args, kwargs: (optional)
+            the function parameters.
+
+        Returns
+        -------
+        returncode: object
+            the function returned value.
+        """
+        ident = get_ident()
+        thread = StatisticalProfiler.sampling_thread(self.period)
+        self._stop_frame = sys._getframe()
+        start_time = perf_counter()
+        thread.add(ident, self)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            thread.remove(ident, self)
+            self.total_time += perf_counter() - start_time
+            self._stop_frame = None
+
+    def hit_stats(self, filename):
+        """ Get the line statistics of a profiled file.
+
+        Parameters
+        ----------
+        filename: str (mandatory)
+            the file name of the code of interest, ie. 'co_filename'.
+
+        Returns
+        -------
+        hit_stats: callable
+            a function that returns the number of samples and the estimated
+            duration of a line number, None if the file has not been
+            profiled.
+        """
+        lines = self._line_dict.get(filename)
+        if lines is None:
+            return None
+        sample_time = self.total_time / self.samples
+
+        def hit_stats(lineno):
+            hits = lines.get(lineno, 0)
+            return hits, hits * sample_time
+
+        return hit_stats
+
+
+class TargetedProfiler(object):
+    """ A deterministic line profiler that only records the line events of
+    the code objects of interest, typically the decorated function own code.
+
+    On Python 3.12+ the 'sys.monitoring' API is used so that the line events
+    are only generated for the code objects of interest. Otherwise a
+    'sys.settrace' global trace function installs a local tracer only on the
+    frames of these code objects. The time spent in the callees that are not
+    traced is accounted to the calling line, the time spent in the traced
+    callees only to their own lines.
+    """
+    estimated = False
+    tool_name = "bredala"
+
+    def __init__(self, codes=None):
+        """ Initialize the TargetedProfiler class.
+
+        Parameters
+        ----------
+        codes: set of code (optional, default None)
+            the code objects of interest, the code object of the profiled
+            function if not set.
+        """
+        self.codes = codes
+        self.total_time = 0
+        self._line_dict = {}
+
+    def _hit(self, code, lineno, duration):
+        """ Record a line execution.
+        """
+        lines = self._line_dict.get(code.co_filename)
+        if lines is None:
+            lines = self._line_dict[code.co_filename] = {}
+        entry = lines.get(lineno)
+        if entry is None:
+            lines[lineno] = [1, duration]
+        else:
+            entry[0] += 1
+            entry[1] += duration
+
+    def runcall(self, func, *args, **kwargs):
+        """ Profile a call.
+
+        Parameters
+        ----------
+        func: callable (mandatory)
+            the function to be profiled.
+        args, kwargs: (optional)
+            the function parameters.
+
+        Returns
+        -------
+        returncode: object
+            the function returned value.
+        """
+        codes = self.codes
+        if codes is None:
+            codes = (getattr(func, "__wrapped__", func).__code__, )
+        monitoring = getattr(sys, "monitoring", None)
+        if monitoring is not None:
+            try:
+                monitoring.use_tool_id(monitoring.PROFILER_ID, self.tool_name)
+            except ValueError:
+                monitoring = None
+        start_time = perf_counter()
+        try:
+            if monitoring is not None:
+                return self._monitor(monitoring, codes, func, args, kwargs)
+            return self._trace(codes, func, args, kwargs)
+        finally:
+            self.total_time += perf_counter() - start_time
+
+    def _trace(self, codes, func, args, kwargs):
+        """ Profile a call with a 'sys.settrace' trace function.
+        """
+        hit = self._hit
+        clock = perf_counter
+        stack = []
+
+        def global_trace(frame, event, arg):
+            if frame.f_code not in codes:
+                return None
+            code = frame.f_code
+            now = clock()
+            pause(stack, now)
+            state = [None, now, 0.]
+            stack.append(state)
+
+            def local_trace(frame, event, arg):
+                if event == "line" or event == "return":
+                    now = clock()
+                    if state[0] is not None:
+                        hit(code, state[0], state[2] + now - state[1])
+                    state[0] = frame.f_lineno
+                    state[1] = now
+                    state[2] = 0.
+                    if event == "return":
+                        stack.pop()
+                        resume(stack, now)
+                return local_trace
+
+            return local_trace
+
+        previous_trace = sys.gettrace()
+        sys.settrace(global_trace)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            sys.settrace(previous_trace)
+
+    def _monitor(self, monitoring, codes, func, args, kwargs):
+        """ Profile a call with the 'sys.monitoring' API.
+        """
+        hit = self._hit
+        clock = perf_counter
+        ident = get_ident()
+        stack = []
+        tool_id = monitoring.PROFILER_ID
+        events = monitoring.events
+
+        def start(code, offset):
+            if get_ident() == ident:
+                now = clock()
+                pause(stack, now)
+                stack.append([None, now, 0., code])
+
+        def line(code, lineno):
+            if get_ident() == ident and stack:
+                state = stack[-1]
+                now = clock()
+                if state[0] is not None:
+                    hit(state[3], state[0], state[2] + now - state[1])
+                state[0] = lineno
+                state[1] = now
+                state[2] = 0.
+
+        def stop(code, offset, retval):
+            if get_ident() == ident and stack:
+                state = stack.pop()
+                now = clock()
+                if state[0] is not None:
+                    hit(state[3], state[0], state[2] + now - state[1])
+                resume(stack, now)
+
+        def unwind(code, offset, exception):
+            if code in codes:
+                stop(code, offset, None)
+
+        # The unwind event can not be set locally: it is only generated when
+        # an exception propagates out of a frame
+        callbacks = (
+            (events.PY_START, start), (events.LINE, line),
+            (events.PY_RETURN, stop), (events.PY_UNWIND, unwind))
+        for event, callback in callbacks:
+            monitoring.register_callback(tool_id, event, callback)
+        for code in codes:
+            monitoring.set_local_events(
+                tool_id, code, events.PY_START | events.LINE |
+                events.PY_RETURN)
+        monitoring.set_events(tool_id, events.PY_UNWIND)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            monitoring.set_events(tool_id, 0)
+            for code in codes:
+                monitoring.set_local_events(tool_id, code, 0)
+            for event, _ in callbacks:
+                monitoring.register_callback(tool_id, event, None)
+            monitoring.free_tool_id(tool_id)
+
+    def hit_stats(self, filename):
+        """ Get the line statistics of a profiled file.
+
+        Parameters
+        ----------
+        filename: str (mandatory)
+            the file name of the code of interest, ie. 'co_filename'.
+
+        Returns
+        -------
+        hit_stats: callable
+            a function that returns the number of hits and the duration of a
+            line number, None if the file has not been profiled.
+        """
+        lines = self._line_dict.get(filename)
+        if lines is None:
+            return None
+
+        def hit_stats(lineno):
+            return tuple(lines.get(lineno, (0, 0)))
+
+        return hit_stats
+
+
+def pause(stack, now):
+    """ Pause the line timer of the innermost traced frame, if any, while a
+    traced callee runs: the callee lines are timed on their own.
+
+    Parameters
+    ----------
+    stack: list of list (mandatory)
+        the traced frames states: the current line number, None before the
+        first line event, the current line timer start and the time already
+        spent on the current line.
+    now: float (mandatory)
+        the current time in seconds.
+    """
+    if stack:
+        state = stack[-1]
+        state[2] += now - state[1]
+
+
+def resume(stack, now):
+    """ Resume the line timer of the innermost traced frame, if any, when a
+    traced callee returns.
+
+    Parameters
+    ----------
+    stack: list of list (mandatory)
+        the traced frames states (see pause).
+    now: float (mandatory)
+        the current time in seconds.
+    """
+    if stack:
+        stack[-1][1] = now
+
+
+PROFILERS = {
+    "deterministic": DeterministicProfiler,
+    "statistical": StatisticalProfiler,
+    "targeted": TargetedProfiler
+}
+
+
+def get_profiler(backend):
+    """ Get a profiler backend factory.
+
+    Parameters
+    ----------
+    backend: str or callable (mandatory)
+        a registered backend name, 'targeted', 'deterministic' or
+        'statistical', or a callable that returns a new backend instance
+        from the code objects of interest.
+
+    Returns
+    -------
+    factory: callable
+        a callable that returns a new backend instance from the code objects
+        of interest.
+    """
+    if callable(backend):
+        return backend
+    if backend not in PROFILERS:
+        raise ValueError("'{0}' profiler backend not recognized.".format(
+            backend))
+    return PROFILERS[backend]
+
+
+def in_profiled_call(code):
+    """ Check if a code object is accounted by a profiled call in progress
+    in the current thread.
+
+    Parameters
+    ----------
+    code: code (mandatory)
+        the code object of a decorated function or class method.
+
+    Returns
+    -------
+    in_progress: bool
+        True if the lines of the code object are recorded by the profiled
+        call in progress.
+    """
+    codes = getattr(_local, "codes", ())
+    return codes is None or code in codes
+
+
+def runcall(profiler, func, *args, **kwargs):
+    """ Run a profiled call.
+
+    The nested calls made in the same thread to a code object accounted by
+    the profiler, eg. the recursive calls, must not start a new profiler
+    (see in_profiled_call). The backends without a 'codes' attribute or with
+    an unset one account all the executed code.
+
+    Parameters
+    ----------
+    profiler: object (mandatory)
+        a profiler backend instance.
+    func: callable (mandatory)
+        the profiled function.
+    args, kwargs: (optional)
+        the function parameters.
+
+    Returns
+    -------
+    returncode: object
+        the function returned value.
+    """
+    previous_codes = getattr(_local, "codes", ())
+    _local.codes = getattr(profiler, "codes", None)
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        _local.codes = previous_codes
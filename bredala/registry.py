@@ -0,0 +1,279 @@
+##########################################################################
+# Bredala - Copyright (C) AGrigis, 2015
+# Distributed under the terms of the CeCILL-B license, as published by
+# the CEA-CNRS-INRIA. Refer to the LICENSE file or to
+# http://www.cecill.info/licences/Licence_CeCILL-B_V1-en.html
+# for details.
+##########################################################################
+
+"""
+Module that matches the imported module names and the module
+functions/methods against the registered names and shell-style patterns.
+
+The module patterns are dotted names whose components may contain
+shell-style wildcards, eg. 'mypkg.sub*.io', the last component being
+possibly '**' to match all the descendant modules, eg. 'mypkg.**'. They are
+compiled in a prefix trie so that an unregistered import is rejected after
+a single lookup in the common case.
+"""
+
+
+# System import
+import re
+import fnmatch
+
+# Bredala import
+import bredala
+
+
+# The characters that make a name a shell-style pattern
+WILDCARDS = frozenset("*?[")
+
+# The compiled regexes of the patterns
+_regexes = {}
+
+
+def is_pattern(name):
+    """ Check if a name is a shell-style pattern.
+
+    Parameters
+    ----------
+    name: str (mandatory)
+        a name.
+
+    Returns
+    -------
+    is_pattern: bool
+        True if the name contains shell-style wildcards.
+    """
+    return not WILDCARDS.isdisjoint(name)
+
+
+def compile_pattern(pattern):
+    """ Get the compiled regex of a shell-style pattern.
+
+    Parameters
+    ----------
+    pattern: str (mandatory)
+        a shell-style pattern.
+
+    Returns
+    -------
+    regex: regex
+        the case-sensitive compiled pattern.
+    """
+    regex = _regexes.get(pattern)
+    if regex is None:
+        regex = _regexes[pattern] = re.compile(fnmatch.translate(pattern))
+    return regex
+
+
+class TrieNode(object):
+    """ A node of the module patterns prefix trie.
+    """
+    __slots__ = ("children", "wildcards", "structs", "descendant_structs")
+
+    def __init__(self):
+        """ Initialize the TrieNode class.
+        """
+        self.children = {}
+        self.wildcards = {}
+        self.structs = []
+        self.descendant_structs = []
+
+
+class ModuleTrie(object):
+    """ A prefix trie of module patterns.
+    """
+    def __init__(self):
+        """ Initialize the ModuleTrie class.
+        """
+        self.root = TrieNode()
+        self.patterns = {}
+        self._cache = {}
+
+    def __contains__(self, pattern):
+        return pattern in self.patterns
+
+    def __getitem__(self, pattern):
+        return self.patterns[pattern]
+
+    def setdefault(self, pattern, decorators_struct):
+        """ Insert a module pattern if it is not already registered.
+
+        Parameters
+        ----------
+        pattern: str (mandatory)
+            a module pattern.
+        decorators_struct: dict of dict
+            the registered decorators of the matching modules.
+
+        Returns
+        -------
+        decorators_struct: dict of dict
+            the registered decorators of the pattern.
+        """
+        if pattern not in self.patterns:
+            self.insert(pattern, decorators_struct)
+        return self.patterns[pattern]
+
+    def insert(self, pattern, decorators_struct):
+        """ Insert a module pattern.
+
+        Parameters
+        ----------
+        pattern: str (mandatory)
+            a module pattern.
+        decorators_struct: dict of dict
+            the registered decorators of the matching modules.
+        """
+        components = pattern.split(".")
+        node = self.root
+        for index, component in enumerate(components):
+            if component == "**":
+                if index != len(components) - 1:
+                    raise ValueError("'**' must be the last component of "
+                                     "the '{0}' pattern.".format(pattern))
+                node.descendant_structs.append(decorators_struct)
+                break
+            if is_pattern(component):
+                if component not in node.wildcards:
+                    node.wildcards[component] = (
+                        compile_pattern(component), TrieNode())
+                node = node.wildcards[component][1]
+            else:
+                node = node.children.setdefault(component, TrieNode())
+        else:
+            node.structs.append(decorators_struct)
+        self.patterns[pattern] = decorators_struct
+        self._cache.clear()
+
+    def remove(self, pattern):
+        """ Remove a module pattern: the trie is rebuilt with the other
+        patterns.
+
+        Parameters
+        ----------
+        pattern: str (mandatory)
+            a registered module pattern.
+
+        Returns
+        -------
+        decorators_struct: dict of dict
+            the registered decorators of the removed pattern, None if the
+            pattern is not registered.
+        """
+        if pattern not in self.patterns:
+            return None
+        patterns = self.patterns
+        decorators_struct = patterns.pop(pattern)
+        self.root = TrieNode()
+        self.patterns = {}
+        for other_pattern, other_struct in patterns.items():
+            self.insert(other_pattern, other_struct)
+        self._cache.clear()
+        return decorators_struct
+
+    def match(self, name):
+        """ Get the registered decorators of the patterns matching a module.
+
+        Parameters
+        ----------
+        name: str (mandatory)
+            a module name.
+
+        Returns
+        -------
+        decorators_structs: list of dict of dict
+            the registered decorators of the matching patterns.
+        """
+        structs = self._cache.get(name)
+        if structs is not None:
+            return structs
+        root = self.root
+        components = name.split(".")
+        if (components[0] not in root.children and
+                len(root.wildcards) == 0 and
+                len(root.descendant_structs) == 0):
+            structs = []
+        else:
+            structs = []
+            nodes = [root]
+            for component in components:
+                next_nodes = []
+                for node in nodes:
+                    structs.extend(node.descendant_structs)
+                    child = node.children.get(component)
+                    if child is not None:
+                        next_nodes.append(child)
+                    for regex, child in node.wildcards.values():
+                        if regex.match(component):
+                            next_nodes.append(child)
+                nodes = next_nodes
+                if len(nodes) == 0:
+                    break
+            for node in nodes:
+                structs.extend(node.structs)
+        self._cache[name] = structs
+        return structs
+
+
+def get_decorators(name):
+    """ Get the decorators registered for a module.
+
+    Parameters
+    ----------
+    name: str (mandatory)
+        a module name.
+
+    Returns
+    -------
+    decorators_struct: dict of dict
+        the functions/methods names or patterns as first keys, the decorator
+        types as second keys and the decorator parameters as values: the
+        module name registrations override the matching patterns ones. None
+        if no decorator is registered for this module.
+    """
+    structs = list(bredala._patterns.match(name))
+    if name in bredala._modules:
+        structs.append(bredala._modules[name])
+    if len(structs) == 0:
+        return None
+    decorators_struct = {}
+    for struct in structs:
+        for filter_name, decorators in struct.items():
+            decorators_struct.setdefault(filter_name, {}).update(decorators)
+    return decorators_struct
+
+
+def get_object_decorators(decorators_struct, name):
+    """ Get the decorators registered for a function or a class method.
+
+    Parameters
+    ----------
+    decorators_struct: dict of dict
+        the decorators registered for a module (see get_decorators).
+    name: str (mandatory)
+        the function name or the '<klass>.<method>' class method name.
+
+    Returns
+    -------
+    decorator_struct: dict
+        the decorator types as keys and the decorator parameters as values:
+        the exact name registrations override the matching patterns ones
+        that override the 'ALL' ones. None if no decorator is registered for
+        this function or class method.
+    """
+    decorator_struct = {}
+    decorator_struct.update(decorators_struct.get("ALL", {}))
+    for filter_name, decorators in decorators_struct.items():
+        if (filter_name != name and is_pattern(filter_name) and
+                compile_pattern(filter_name).match(name)):
+            decorator_struct.update(decorators)
+    decorator_struct.update(decorators_struct.get(name, {}))
+    if len(decorator_struct) == 0:
+        return None
+    return decorator_struct
+
+
+bredala._patterns = ModuleTrie()
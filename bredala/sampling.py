@@ -0,0 +1,64 @@
+##########################################################################
+# Bredala - Copyright (C) AGrigis, 2015
+# Distributed under the terms of the CeCILL-B license, as published by
+# the CEA-CNRS-INRIA. Refer to the LICENSE file or to
+# http://www.cecill.info/licences/Licence_CeCILL-B_V1-en.html
+# for details.
+##########################################################################
+
+"""
+Module that selects which calls of a decorated function/method are profiled.
+"""
+
+
+# System import
+import time
+
+
+class Sampler(object):
+    """ Decide which calls are profiled: 1 in N calls and/or at most X
+    profiled calls per second.
+    """
+    def __init__(self, sample_rate=None, sample_budget=None):
+        """ Initialize the Sampler class.
+
+        Parameters
+        ----------
+        sample_rate: int (optional, default None)
+            profile 1 in 'sample_rate' calls, all the calls if not set.
+        sample_budget: float (optional, default None)
+            the maximum number of profiled calls per second, unlimited if not
+            set.
+        """
+        if sample_rate is not None and int(sample_rate) < 1:
+            raise ValueError("The sample rate must be a positive integer.")
+        if sample_budget is not None and sample_budget <= 0:
+            raise ValueError("The sample budget must be positive.")
+        self.sample_rate = int(sample_rate or 1)
+        self.sample_budget = sample_budget
+        self.calls = 0
+        self.samples = 0
+        self._window_start = None
+        self._window_samples = 0
+
+    def sample(self):
+        """ Decide if the current call is profiled.
+
+        Returns
+        -------
+        sampled: bool
+            True if the current call has to be profiled.
+        """
+        self.calls += 1
+        if (self.calls - 1) % self.sample_rate != 0:
+            return False
+        if self.sample_budget is not None:
+            now = time.time()
+            if self._window_start is None or now - self._window_start >= 1.:
+                self._window_start = now
+                self._window_samples = 0
+            if self._window_samples >= self.sample_budget:
+                return False
+            self._window_samples += 1
+        self.samples += 1
+        return True
@@ -13,16 +13,45 @@ Modules that defines the package custom decorators displayed to user.
 
 
 # System import
-from __future__ import print_function
-import sys
+import dis
+import types
+import itertools
 import inspect
+import linecache
+import functools
 import time
+import weakref
+from io import StringIO
+from threading import get_ident
+from time import perf_counter_ns
 import numpy
 import pprofile
 
+# Bredala import
+import bredala
+from .typedecorator import compose
+from .stats import record
+from .stats import push_call
+from .stats import pop_call
+from .stats import record_profile
+from .sampling import Sampler
+from .profilers import get_profiler
+from .profilers import in_profiled_call
+from .profilers import runcall
+from .sinks import emit
+
+
+# The instrumentation switches of the decorated functions/methods
+bredala._switches = weakref.WeakSet()
+
+
+VERBOSITY_LEVELS = ("off", "timing", "signature", "profile")
+
 
 def bredala_signature(obj, is_method=False, use_profiler=True,
-                      type_decorators=None):
+                      type_decorators=None, aggregate=False, sample_rate=None,
+                      sample_budget=None, profiler_backend="targeted",
+                      trace_registered=False, verbosity=None):
     """ Create a decorator that display a function or a class method signature
     and execution time.
 
@@ -36,208 +65,955 @@ def bredala_signature(obj, is_method=False, use_profiler=True,
         if True display the input object execution profile.
     type_decorators: list of 2-uplet (optional, default None)
         a list of decorator function, parameters ad tuple of types.
+    aggregate: bool (optional, default False)
+        if True do not display anything but record the input object
+        execution time in the in-memory statistics (see bredala.report).
+        In this mode only the sampled calls are profiled.
+    sample_rate: int (optional, default None)
+        profile only 1 in 'sample_rate' calls, the other calls are only
+        timed. The line profiles of the sampled calls are merged (see
+        bredala.report).
+    sample_budget: float (optional, default None)
+        profile at most 'sample_budget' calls per second, the other calls are
+        only timed. The line profiles of the sampled calls are merged (see
+        bredala.report).
+    profiler_backend: str or callable (optional, default 'targeted')
+        the line profiler backend: 'targeted', 'deterministic',
+        'statistical' or a callable that returns a new backend instance from
+        the code objects of interest.
+    trace_registered: bool (optional, default False)
+        if True the targeted line profiler also traces the code of all the
+        other decorated functions/methods, otherwise only the input object
+        code.
+    verbosity: str (optional, default None)
+        the emitted records: 'off' (nothing), 'timing' (the execution time),
+        'signature' (the call signature and the execution time) or 'profile'
+        (the call signature, the execution time and profile). If not set,
+        'profile' if 'use_profiler' is True, 'signature' otherwise.
+
+    Coroutine functions are not line profiled: the elapsed time of their
+    calls, the time actually running on the event loop and the number of
+    suspensions are recorded when the coroutines complete.
+    Generator functions are not line profiled either: the time spent
+    producing the items and the number of items are recorded when the
+    generators are exhausted or closed.
+
+    The returned wrapper keeps the identity metadata of the decorated object,
+    binds like a function when set as a class attribute and is pickled by
+    reference. Its 'switch' attribute is the runtime instrumentation switch
+    (see bredala.enable and bredala.disable).
 
     Retruns
     -------
     wrapper: callable
         the decorated input object.
     """
-    type_decorators = type_decorators or []
+    # Get the verbosity level: the signatures are only formatted when the
+    # emitted records are written
+    if verbosity is None:
+        verbosity = "profile" if use_profiler else "signature"
+    if verbosity not in VERBOSITY_LEVELS:
+        raise ValueError("'{0}' verbosity level not recognized.".format(
+            verbosity))
+    is_coroutine = inspect.iscoroutinefunction(obj)
+    is_generator = inspect.isgeneratorfunction(obj)
+    use_profiler = ((verbosity == "profile") and not is_coroutine and
+                    not is_generator)
+    with_signature = (verbosity in ("signature", "profile"))
+
+    plan = BindingPlan(obj, is_method=is_method)
+    checked_obj = compose(obj, type_decorators or [])
+    new_profiler = get_profiler(profiler_backend)
+    bredala._codes.add(obj.__code__)
+    if trace_registered:
+        codes = bredala._codes
+    else:
+        codes = frozenset([obj.__code__])
+    sampler = None
+    if use_profiler and (sample_rate is not None or
+                         sample_budget is not None):
+        sampler = Sampler(sample_rate=sample_rate,
+                          sample_budget=sample_budget)
+    elif aggregate:
+        use_profiler = False
+    if use_profiler:
+        source = SourceRange(obj)
+
+    def merge_profile(obj_name, profiler):
+        """ Merge the line profile of a sampled call.
+        """
+        record_profile(obj_name, source.first_lineno, source.lines,
+                       source.timings(profiler))
 
+    def coroutine_done(args, kwargs, start, end, running, suspensions,
+                       status):
+        """ Record a completed coroutine call.
+        """
+        if aggregate:
+            record(plan.qualified_name(plan.self_parameter(args, kwargs)),
+                   (end - start) * 1e-9, running=running * 1e-9,
+                   suspensions=suspensions)
+        else:
+            emit(ReturnRecord(plan, args, kwargs, start, end, get_ident(),
+                              status=status, with_name=not with_signature,
+                              running=running, suspensions=suspensions))
+
+    def generator_done(args, kwargs, start, end, running, items, status):
+        """ Record an exhausted or closed generator.
+        """
+        if aggregate:
+            record(plan.qualified_name(plan.self_parameter(args, kwargs)),
+                   (end - start) * 1e-9, running=running * 1e-9,
+                   items=items)
+        else:
+            emit(ReturnRecord(plan, args, kwargs, start, end, get_ident(),
+                              status=status, with_name=not with_signature,
+                              running=running, items=items))
+
+    # The direct call used when the instrumentation is disabled
+    if plan.drop_cls:
+        def direct(*args, **kwargs):
+            return checked_obj(*args[1:], **kwargs)
+    else:
+        direct = checked_obj
+    switch = Switch("{0}.{1}".format(
+        obj.__module__, getattr(obj, "__qualname__", obj.__name__)))
+
+    @functools.wraps(obj)
     def wrapper(*args, **kwargs):
         """ Define the input object decorator.
         """
-        # Get the function parameters
-        arg_spec = inspect.getargspec(obj)
-        defaults = [repr(item) for item in arg_spec.defaults or []]
-        optional = dict(zip(reversed(arg_spec.args or []), reversed(defaults)))
-        for name, value in kwargs.items():
-            if name in optional:
-                optional[name] = object_repr(value)
-        mandatory = []
-        self_parameter = None
-        for index in range(len(arg_spec.args) - len(optional)):
+        if not switch.active or verbosity == "off":
+            return direct(*args, **kwargs)
+        # Profile only the outermost call: the recursive calls, or the nested
+        # calls traced with 'trace_registered', are accounted by the profiler
+        # in progress
+        profiled = (use_profiler and not in_profiled_call(obj.__code__) and
+                    (sampler is None or sampler.sample()))
+        if plan.drop_cls:
+            call_args = args[1:]
+        else:
+            call_args = args
+
+        # Coroutine: the steps run on the event loop are timed when the
+        # returned awaitable is driven
+        if is_coroutine:
+            if with_signature and not aggregate:
+                emit(CallRecord(plan, args, kwargs))
+            return TimedCoroutine(
+                checked_obj(*call_args, **kwargs),
+                functools.partial(coroutine_done, args, kwargs))
+
+        # Generator: the steps that produce the items are timed when the
+        # returned generator is iterated
+        if is_generator:
+            if with_signature and not aggregate:
+                emit(CallRecord(plan, args, kwargs))
+            return timed_generator(
+                checked_obj(*call_args, **kwargs),
+                functools.partial(generator_done, args, kwargs))
+
+        # Aggregation mode: only record the execution time, the decorated
+        # callers are tracked on a per-thread call stack
+        if aggregate:
+            obj_name = plan.qualified_name(plan.self_parameter(args, kwargs))
+            push_call(obj_name)
+            start = perf_counter_ns()
             try:
-                if index < len(args):
-                    value = args[index]
+                if profiled:
+                    profiler = new_profiler(codes)
+                    returncode = runcall(
+                        profiler, checked_obj, *call_args, **kwargs)
                 else:
-                    value = kwargs[arg_spec.args[index]]
-                if arg_spec.args[index] == "self":
-                    self_parameter = value
-                if arg_spec.args[index] == "cls":
-                    args = args[1:]
-                value_repr = object_repr(value)
-                mandatory.append((arg_spec.args[index], value_repr))
-            except:
-                mandatory.append((arg_spec.args[index], None))
-                raise
+                    returncode = checked_obj(*call_args, **kwargs)
+            finally:
+                end = bredala._calibration.correct(start, perf_counter_ns())
+                pop_call((end - start) * 1e-9)
+            if profiled:
+                merge_profile(obj_name, profiler)
+            return returncode
 
-        # Create the function signature
-        params = ["{0}={1}".format(name, val) for name, val in mandatory]
-        params.extend([
-            "{0}={1}".format(name, val) for name, val in optional.items()])
-        signature = "{0}({1})".format(obj.__name__, ", ".join(params))
-
-        # Display a start call message
-        module = obj.__module__
-        package_name = module.split(".")[0]
-        if is_method:
-            obj_name = (module + "." + self_parameter.__class__.__name__ +
-                        "." + obj.__name__)
-        else:
-            obj_name = module + "." + obj.__name__
-        print("{0}\n[{1}] Calling {2}...\n{3}".format(
-            80 * "_", package_name, obj_name, signature))
-
-        # A type signature if requested
-        _obj = obj
-        for decorator, registered_types in type_decorators:
-            _obj = decorator(*registered_types)(_obj)
-
-        # Call
-        start_time = time.time()
-        if use_profiler:
-            profiler = pprofile.Profile()
-            returncode = profiler.runcall(obj, *args, **kwargs)
-        else:
-            returncode = _obj(*args, **kwargs)
-        duration = time.time() - start_time
+        # Emit a start call message: only the call parameters references are
+        # kept
+        if with_signature:
+            emit(CallRecord(plan, args, kwargs))
 
-        # Display execution profile
-        if use_profiler:
-            obj_code = inspect.getsourcelines(obj)[0]
-            annotate(profiler, sys.stdout, inspect.getmodule(obj).__file__,
-                     obj_code)
+        # Call and emit an end message with the execution status and profile
+        profiler = None
+        status = "ok"
+        start = perf_counter_ns()
+        try:
+            if profiled:
+                profiler = new_profiler(codes)
+                return runcall(profiler, checked_obj, *call_args, **kwargs)
+            return checked_obj(*call_args, **kwargs)
+        except BaseException as exc:
+            status = exc.__class__.__name__
+            raise
+        finally:
+            end = bredala._calibration.correct(start, perf_counter_ns())
+            profile = None
+            if profiler is not None:
+                if sampler is not None:
+                    merge_profile(plan.qualified_name(
+                        plan.self_parameter(args, kwargs)), profiler)
+                profile = (profiler, source)
+            emit(ReturnRecord(plan, args, kwargs, start, end, get_ident(),
+                              status=status, profile=profile,
+                              with_name=not with_signature))
 
-        # Display an end message
-        msg = "{0:.1f}s, {1:.1f}min".format(duration, duration / 60.)
-        print(max(0, (80 - len(msg))) * '_' + msg)
+    # Coroutine: an 'async def' wrapper is recognized as a coroutine
+    # function and returns a real coroutine
+    if is_coroutine:
+        timed_wrapper = wrapper
+
+        @functools.wraps(obj)
+        async def wrapper(*args, **kwargs):
+            """ Define the input coroutine function decorator.
+            """
+            return await timed_wrapper(*args, **kwargs)
 
-        return returncode
+    # Generator: a delegating wrapper is recognized as a generator function
+    # and returns a real generator
+    elif is_generator:
+        timed_wrapper = wrapper
 
+        @functools.wraps(obj)
+        def wrapper(*args, **kwargs):
+            """ Define the input generator function decorator.
+            """
+            return (yield from timed_wrapper(*args, **kwargs))
+
+    wrapper.switch = switch
     return wrapper
 
 
-def object_repr(obj):
-    """ Representation of a Pyton object.
+class Switch(object):
+    """ The runtime instrumentation switch of a decorated function or class
+    method.
 
-    Parameters
-    ----------
-    obj: object
-        a Python object.
+    The calls are instrumented only if both the global flag (see
+    bredala.is_enabled) and the switch 'enabled' attribute are True,
+    otherwise the decorated object is called directly after a single flag
+    check. Both flags are set with bredala.enable and bredala.disable that
+    update the 'active' attribute read by the wrapper.
+    """
+    __slots__ = ("name", "enabled", "active", "__weakref__")
 
-    Returns
-    -------
-    obj_repr: str
-        the representation of the Python object.
+    def __init__(self, name):
+        """ Initialize the Switch class.
+
+        Parameters
+        ----------
+        name: str (mandatory)
+            the qualified name of the decorated function or class method.
+        """
+        self.name = name
+        self.enabled = True
+        self.active = bredala._enabled
+        bredala._switches.add(self)
+
+    def update(self):
+        """ Update the switch state from the global flag.
+        """
+        self.active = bredala._enabled and self.enabled
+
+
+class TimedCoroutine(object):
+    """ An awaitable that drives a coroutine and times the steps it runs on
+    the event loop until its next suspension.
+
+    A callback receives the start and end 'perf_counter_ns' times of the
+    coroutine, the time spent running its steps in nanoseconds, the number
+    of suspensions and its status, 'ok' or the name of the raised exception
+    class, when it completes.
     """
-    if isinstance(obj, (list, tuple, set)):
-        obj_repr = iter_repr(obj)
-    elif isinstance(obj, dict):
-        obj_repr = dict_repr(obj)
-    elif isinstance(obj, numpy.ndarray):
-        obj_repr = array_repr(numpy.asarray(obj))
-    else:
-        obj_repr = repr(obj)
-    return obj_repr
+    def __init__(self, steps, done):
+        """ Initialize the TimedCoroutine class.
+
+        Parameters
+        ----------
+        steps: coroutine (mandatory)
+            the coroutine to be driven.
+        done: callable (mandatory)
+            the completion callback.
+        """
+        self.steps = steps
+        self.done = done
+        self.start = None
+        self.running = 0
+        self.suspensions = 0
+
+    def __await__(self):
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.send(None)
+
+    def send(self, value):
+        """ Resume with a value.
+        """
+        return self._step(self.steps.send, value)
+
+    def throw(self, *args):
+        """ Resume with an exception.
+        """
+        return self._step(self.steps.throw, *args)
+
+    def close(self):
+        """ Close the coroutine.
+        """
+        step_start = perf_counter_ns()
+        self.steps.close()
+        if self.start is not None:
+            self._finish(step_start, "GeneratorExit")
+
+    def _step(self, method, *args):
+        """ Run a step until the next suspension.
+        """
+        step_start = perf_counter_ns()
+        if self.start is None:
+            self.start = step_start
+        try:
+            result = method(*args)
+        except StopIteration:
+            self._finish(step_start, "ok")
+            raise
+        except BaseException as exc:
+            self._finish(step_start, exc.__class__.__name__)
+            raise
+        self.running += perf_counter_ns() - step_start
+        self.suspensions += 1
+        return result
+
+    def _finish(self, step_start, status):
+        """ Call the completion callback.
+        """
+        end = perf_counter_ns()
+        self.running += end - step_start
+        self.start, start = None, self.start
+        self.done(start, end, self.running, self.suspensions, status)
+
 
+def timed_generator(generator, done):
+    """ Drive a generator and time the steps that produce its items.
 
-def array_repr(array):
-    """ Representation of a numpy array.
+    The values sent and the exceptions thrown are forwarded to the driven
+    generator. A callback receives the start and end 'perf_counter_ns' times
+    of the generator, the time spent producing its items in nanoseconds, the
+    number of items and its status, 'ok' or the name of the raised exception
+    class, when it is exhausted or closed: closing the generator before its
+    exhaustion is not an error.
 
     Parameters
     ----------
-    array: array (mandatory)
-        a numpy array.
+    generator: generator (mandatory)
+        the generator to be driven.
+    done: callable (mandatory)
+        the completion callback.
 
-    Returns
-    -------
-    repr: str
-        the representation of the numpy array.
+    Yields
+    ------
+    item: object
+        the items produced by the driven generator.
     """
-    return " ".join([item.strip() for item in repr(array).split("\n")])
+    start = perf_counter_ns()
+    running = 0
+    items = 0
+    status = "ok"
+    method, arg = generator.send, None
+    try:
+        while True:
+            step_start = perf_counter_ns()
+            try:
+                item = method(arg)
+            except StopIteration as exc:
+                return exc.value
+            except BaseException as exc:
+                status = exc.__class__.__name__
+                raise
+            finally:
+                running += perf_counter_ns() - step_start
+            items += 1
+            try:
+                method, arg = generator.send, (yield item)
+            except GeneratorExit:
+                step_start = perf_counter_ns()
+                try:
+                    generator.close()
+                except BaseException as exc:
+                    status = exc.__class__.__name__
+                    raise
+                finally:
+                    running += perf_counter_ns() - step_start
+                raise
+            except BaseException as exc:
+                method, arg = generator.throw, exc
+    finally:
+        done(start, perf_counter_ns(), running, items, status)
 
 
-def iter_repr(iter_obj):
-    """ Representation of an iterable object.
+class CallRecord(object):
+    """ The record emitted when a decorated object is called.
 
-    Parameters
-    ----------
-    iter_obj: list, set, tuple
-        an iterable object.
+    Only the call parameters references are kept: the signature is formatted
+    when the record is written. Mutable parameters modified in the meantime
+    are displayed with their new value.
+    """
+    __slots__ = ("plan", "args", "kwargs")
 
-    Returns
-    -------
-    repr: str
-        the representation of the iterable object.
+    def __init__(self, plan, args, kwargs):
+        """ Initialize the CallRecord class.
+
+        Parameters
+        ----------
+        plan: BindingPlan (mandatory)
+            the call-binding plan of the called object.
+        args: tuple (mandatory)
+            the call positional arguments.
+        kwargs: dict (mandatory)
+            the call keyword arguments.
+        """
+        self.plan = plan
+        self.args = args
+        self.kwargs = kwargs
+
+    def format(self):
+        """ Format the record.
+
+        Returns
+        -------
+        text: str
+            the start call message.
+        """
+        signature, self_parameter = self.plan.signature(
+            self.args, self.kwargs)
+        return "{0}\n[{1}] Calling {2}...\n{3}\n".format(
+            80 * "_", self.plan.package_name,
+            self.plan.qualified_name(self_parameter), signature)
+
+
+class ReturnRecord(object):
+    """ The record emitted when a decorated object returns or raises.
+
+    The record also holds the information written in the trace files (see
+    bredala.sinks.TraceSink).
     """
-    # Get the separator based on the object type.
-    if isinstance(iter_obj, list):
-        separator = ("[", "]")
-    elif isinstance(iter_obj, tuple):
-        separator = ("(", ")")
-    elif isinstance(iter_obj, set):
-        separator = ("{", "}")
-    else:
-        return repr(iter_obj)
+    __slots__ = ("plan", "args", "kwargs", "start", "end", "thread", "status",
+                 "profile", "with_name", "running", "suspensions", "items")
 
-    # Get the representation of each inner object.
-    if len(iter_obj) <= 10:
-        inner_objs = [object_repr(elem) for elem in iter_obj]
-    else:
-        inner_objs = [object_repr(elem) for elem in list(iter_obj)[:5]]
-        inner_objs.append("...")
-        inner_objs.extend([object_repr(elem) for elem in list(iter_obj)[-5:]])
-    return separator[0] + ", ".join(inner_objs) + separator[1]
+    def __init__(self, plan, args, kwargs, start, end, thread, status="ok",
+                 profile=None, with_name=False, running=None,
+                 suspensions=None, items=None):
+        """ Initialize the ReturnRecord class.
 
+        Parameters
+        ----------
+        plan: BindingPlan (mandatory)
+            the call-binding plan of the called object.
+        args: tuple (mandatory)
+            the call positional arguments.
+        kwargs: dict (mandatory)
+            the call keyword arguments.
+        start, end: int (mandatory)
+            the call start and end 'perf_counter_ns' times, the calibrated
+            timing overhead being subtracted from the synchronous calls end
+            time.
+        thread: int (mandatory)
+            the identifier of the calling thread.
+        status: str (optional, default 'ok')
+            'ok' or the name of the raised exception class.
+        profile: 2-uplet (optional, default None)
+            the profiler used during the call and the profiled object
+            SourceRange.
+        with_name: bool (optional, default False)
+            if True display the qualified name of the called object, used
+            when no start call message has been emitted.
+        running: int (optional, default None)
+            for a coroutine, the time spent running on the event loop, for a
+            generator the time spent producing the items, in nanoseconds.
+        suspensions: int (optional, default None)
+            for a coroutine, the number of suspensions.
+        items: int (optional, default None)
+            for a generator, the number of yielded items.
+        """
+        self.plan = plan
+        self.args = args
+        self.kwargs = kwargs
+        self.start = start
+        self.end = end
+        self.thread = thread
+        self.status = status
+        self.profile = profile
+        self.with_name = with_name
+        self.running = running
+        self.suspensions = suspensions
+        self.items = items
+
+    @property
+    def duration(self):
+        """ The call execution time in seconds.
+        """
+        return (self.end - self.start) * 1e-9
+
+    @property
+    def obj_name(self):
+        """ The qualified name of the called object.
+        """
+        return self.plan.qualified_name(
+            self.plan.self_parameter(self.args, self.kwargs))
+
+    def signature(self, max_chars=None):
+        """ The call signature, optionally truncated.
+
+        Parameters
+        ----------
+        max_chars: int (optional, default None)
+            the maximum number of characters.
+
+        Returns
+        -------
+        signature: str
+            the call signature.
+        """
+        signature = self.plan.signature(self.args, self.kwargs)[0]
+        if max_chars is not None:
+            signature = BoundedRepr.truncate(signature, max_chars)
+        return signature
+
+    def format(self):
+        """ Format the record.
+
+        Returns
+        -------
+        text: str
+            the execution profile and the end message.
+        """
+        out = StringIO()
+        if self.profile is not None:
+            profiler, source = self.profile
+            annotate(profiler, out, source)
+        duration = self.duration
+        msg = "{0:.1f}s, {1:.1f}min".format(duration, duration / 60.)
+        if self.suspensions is not None:
+            msg = "{0} suspensions, {1:.1f}s running, {2}".format(
+                self.suspensions, self.running * 1e-9, msg)
+        if self.items is not None:
+            msg = "{0} items, {1:.3g}s per item, {2:.1f}s running, {3}".format(
+                self.items, self.running * 1e-9 / max(self.items, 1),
+                self.running * 1e-9, msg)
+        elif (self.suspensions is None and
+                bredala._calibration.is_noise(duration)):
+            msg = "{0} (within the noise floor)".format(msg)
+        if self.status != "ok":
+            msg = "{0} raised, {1}".format(self.status, msg)
+        if self.with_name:
+            msg = "{0} {1}".format(self.obj_name, msg)
+        out.write(max(0, (80 - len(msg))) * "_" + msg + "\n")
+        return out.getvalue()
+
+
+class BindingPlan(object):
+    """ The call-binding plan of a function or a class method.
+
+    All the introspection needed to display a call signature is done once
+    when the object is decorated: the per-call path only performs lookups.
+    """
+    def __init__(self, obj, is_method=False):
+        """ Initialize the BindingPlan class.
+
+        Parameters
+        ----------
+        obj: callable (mandatory)
+            a function or a class method object.
+        is_method: bool (optional, default False)
+            True if the input object it a method of a class, False otherwise.
+        """
+        arg_spec = inspect.getfullargspec(obj)
+        kwonlyargs = arg_spec.kwonlyargs or []
+        kwonlydefaults = arg_spec.kwonlydefaults or {}
+        self.name = obj.__name__
+        self.module = obj.__module__
+        self.package_name = self.module.split(".")[0]
+        self.is_method = is_method
+        self.obj_name = self.module + "." + self.name
+        self._class_names = {}
+
+        # Parameter names and default representations
+        self.args = tuple(arg_spec.args or [])
+        defaults = arg_spec.defaults or ()
+        self.nb_mandatory = len(self.args) - len(defaults)
+        self.defaults = (
+            (None, ) * self.nb_mandatory +
+            tuple(repr(item) for item in defaults))
+        self.kwonly = tuple(
+            (name, repr(kwonlydefaults[name]) if name in kwonlydefaults
+             else None) for name in kwonlyargs)
+
+        # Position of the special 'self'/'cls' parameters
+        mandatory = self.args[:self.nb_mandatory]
+        self.self_index = mandatory.index("self") if "self" in mandatory \
+            else None
+        self.drop_cls = "cls" in mandatory
+
+    def qualified_name(self, self_parameter=None):
+        """ Get the fully qualified name of the decorated object.
 
-def dict_repr(dict_obj):
-    """ Representation of a dictionary object.
+        Parameters
+        ----------
+        self_parameter: object (optional, default None)
+            for class methods, the instance the method is called on.
+
+        Returns
+        -------
+        obj_name: str
+            the qualified name of the decorated object.
+        """
+        if not self.is_method or self_parameter is None:
+            return self.obj_name
+        klass = self_parameter.__class__
+        obj_name = self._class_names.get(klass)
+        if obj_name is None:
+            obj_name = "{0}.{1}.{2}".format(
+                self.module, klass.__name__, self.name)
+            self._class_names[klass] = obj_name
+        return obj_name
+
+    def signature(self, args, kwargs):
+        """ Build the call signature.
+
+        Parameters
+        ----------
+        args: tuple (mandatory)
+            the call positional arguments.
+        kwargs: dict (mandatory)
+            the call keyword arguments.
+
+        Returns
+        -------
+        signature: str
+            the call signature.
+        self_parameter: object
+            the instance a class method is called on, None otherwise.
+        """
+        nb_args = len(args)
+        params = []
+        for index, name in enumerate(self.args):
+            if index < nb_args:
+                value_repr = object_repr(args[index])
+            elif name in kwargs:
+                value_repr = object_repr(kwargs[name])
+            elif index >= self.nb_mandatory:
+                value_repr = self.defaults[index]
+            else:
+                raise KeyError(name)
+            params.append(name + "=" + value_repr)
+        for name, default_repr in self.kwonly:
+            if name in kwargs:
+                params.append(name + "=" + object_repr(kwargs[name]))
+            elif default_repr is not None:
+                params.append(name + "=" + default_repr)
+            else:
+                raise KeyError(name)
+        return (self.name + "(" + ", ".join(params) + ")",
+                self.self_parameter(args, kwargs))
+
+    def self_parameter(self, args, kwargs):
+        """ Get the instance a class method is called on.
+
+        Parameters
+        ----------
+        args: tuple (mandatory)
+            the call positional arguments.
+        kwargs: dict (mandatory)
+            the call keyword arguments.
+
+        Returns
+        -------
+        self_parameter: object
+            the instance a class method is called on, None otherwise.
+        """
+        if self.self_index is None:
+            return None
+        if self.self_index < len(args):
+            return args[self.self_index]
+        return kwargs.get("self")
+
+
+class BoundedRepr(object):
+    """ A representation engine with depth, item and character budgets.
+
+    Containers are never copied: only their first (and for sequences last)
+    items are visited, and their brackets, separators and keys are charged
+    to the character budget. Long strings and bytes are cut before their
+    representation. Large numpy arrays are summarized from their metadata
+    (shape, dtype, nbytes) and optionally from a strided sample of their
+    values.
+    """
+    def __init__(self, max_depth=3, max_items=10, max_chars=1000,
+                 array_stats=False):
+        """ Initialize the BoundedRepr class.
+
+        Parameters
+        ----------
+        max_depth: int (optional, default 3)
+            the maximum nesting level of the displayed containers.
+        max_items: int (optional, default 10)
+            the maximum number of displayed items of a container.
+        max_chars: int (optional, default 1000)
+            the maximum number of characters of a representation.
+        array_stats: bool (optional, default False)
+            if True display the min/max values of a strided sample of the
+            large numpy arrays.
+        """
+        self.max_depth = max_depth
+        self.max_items = max_items
+        self.max_chars = max_chars
+        self.array_stats = array_stats
+        self._remaining = max_chars
+
+    def repr(self, obj):
+        """ Representation of a Python object.
+
+        Parameters
+        ----------
+        obj: object
+            a Python object.
+
+        Returns
+        -------
+        obj_repr: str
+            the representation of the Python object.
+        """
+        self._remaining = self.max_chars
+        return self.truncate(self.object_repr(obj, 0), self.max_chars)
+
+    @classmethod
+    def truncate(cls, text, max_chars):
+        """ Truncate a representation.
+        """
+        if len(text) > max_chars:
+            return text[:max(0, max_chars - 3)] + "..."
+        return text
+
+    def object_repr(self, obj, depth):
+        """ Representation of a Python object at a given nesting level.
+        """
+        if self._remaining <= 0:
+            return "..."
+        if isinstance(obj, (list, tuple, set, frozenset)):
+            return self.iter_repr(obj, depth)
+        elif isinstance(obj, dict):
+            return self.dict_repr(obj, depth)
+        elif isinstance(obj, numpy.ndarray):
+            obj_repr = self.array_repr(obj)
+        elif (isinstance(obj, (str, bytes, bytearray)) and
+                len(obj) > self._remaining):
+            obj_repr = repr(obj[:self._remaining]) + "..."
+        else:
+            obj_repr = self.truncate(repr(obj), self._remaining)
+        self._remaining -= len(obj_repr)
+        return obj_repr
+
+    def array_repr(self, array):
+        """ Representation of a numpy array.
+        """
+        if array.size <= self.max_items:
+            return " ".join([item.strip() for item in repr(array).split("\n")])
+        summary = "array(shape={0}, dtype={1}, nbytes={2}".format(
+            array.shape, array.dtype, array.nbytes)
+        if self.array_stats and array.dtype.kind in "biuf":
+            step = max(1, array.size // (self.max_items * 100))
+            sample = array.flat[::step]
+            summary += ", sample_min={0}, sample_max={1}".format(
+                sample.min(), sample.max())
+        return summary + ")"
+
+    def iter_repr(self, iter_obj, depth):
+        """ Representation of a list, tuple or set object.
+        """
+        # Get the separator based on the object type.
+        if isinstance(iter_obj, list):
+            separator = ("[", "]")
+        elif isinstance(iter_obj, tuple):
+            separator = ("(", ")")
+        elif len(iter_obj) == 0:
+            return repr(iter_obj)
+        elif isinstance(iter_obj, frozenset):
+            separator = ("frozenset({", "})")
+        else:
+            separator = ("{", "}")
+        self._remaining -= len(separator[0]) + len(separator[1])
+        if depth >= self.max_depth and len(iter_obj) > 0:
+            return separator[0] + "..." + separator[1]
+
+        # Get the representation of the first and last inner objects.
+        size = len(iter_obj)
+        if size <= self.max_items:
+            elems = iter_obj
+            tail = ()
+        elif isinstance(iter_obj, (list, tuple)):
+            nb_head = (self.max_items + 1) // 2
+            elems = itertools.islice(iter_obj, nb_head)
+            tail = (iter_obj[index] for index in range(
+                size - self.max_items // 2, size))
+        else:
+            elems = itertools.islice(iter_obj, self.max_items)
+            tail = ()
+        inner_objs = self.items_repr(elems, depth)
+        if size > self.max_items:
+            inner_objs.append("...")
+            inner_objs.extend(self.items_repr(tail, depth))
+        return separator[0] + ", ".join(inner_objs) + separator[1]
+
+    def dict_repr(self, dict_obj, depth):
+        """ Representation of a dictionary object.
+        """
+        self._remaining -= 2
+        if depth >= self.max_depth and len(dict_obj) > 0:
+            return "{...}"
+        inner_objs = []
+        for key, value in itertools.islice(dict_obj.items(), self.max_items):
+            if self._remaining <= 0:
+                inner_objs.append("...")
+                break
+            self._remaining -= 4
+            inner_objs.append("{0}: {1}".format(
+                self.object_repr(key, depth + 1),
+                self.object_repr(value, depth + 1)))
+        else:
+            if len(dict_obj) > self.max_items:
+                inner_objs.append("...")
+        return "{" + ", ".join(inner_objs) + "}"
+
+    def items_repr(self, items, depth):
+        """ Representations of the inner objects of a container, within the
+        character budget.
+        """
+        inner_objs = []
+        for elem in items:
+            if self._remaining <= 0:
+                inner_objs.append("...")
+                break
+            self._remaining -= 2
+            inner_objs.append(self.object_repr(elem, depth + 1))
+        return inner_objs
+
+
+def object_repr(obj):
+    """ Representation of a Pyton object.
+
+    The representation is bounded by the 'REPR_MAX_DEPTH', 'REPR_MAX_ITEMS'
+    and 'REPR_MAX_CHARS' globals, and large numpy arrays are summarized.
 
     Parameters
     ----------
-    dict_obj: dict
-        a dictionary object.
+    obj: object
+        a Python object.
 
     Returns
     -------
-    dict_repr: str
-        the representation of the dictionary object.
+    obj_repr: str
+        the representation of the Python object.
     """
-    # Get the separator based on the object type.
-    if isinstance(dict_obj, dict):
-        dict_repr = "{"
-    else:
-        return repr(iter_obj)
+    return BoundedRepr(
+        max_depth=bredala.REPR_MAX_DEPTH, max_items=bredala.REPR_MAX_ITEMS,
+        max_chars=bredala.REPR_MAX_CHARS,
+        array_stats=bredala.REPR_ARRAY_STATS).repr(obj)
+
+
+class SourceRange(object):
+    """ The source lines of a function or a class method.
+
+    The line range is computed once from the code object first line number
+    and line table, so that the profiled timings of the object can be sliced
+    directly, without comparing source texts.
+    """
+    def __init__(self, obj):
+        """ Initialize the SourceRange class.
+
+        Parameters
+        ----------
+        obj: callable (mandatory)
+            a function or a class method object.
+        """
+        code = obj.__code__
+        self.filename = code.co_filename
+        self.first_lineno = code.co_firstlineno
+        self.last_lineno = max(self.first_lineno, SourceRange.last_line(code))
+        lines = linecache.getlines(self.filename, obj.__globals__)
+        self.lines = lines[self.first_lineno - 1: self.last_lineno]
+        self.lines.extend(
+            [""] * (self.last_lineno - self.first_lineno + 1 -
+                    len(self.lines)))
 
-    # Get the representation of each inner object.
-    for key, value in dict_obj.items():
-        dict_repr += "'{0}': {1},".format(key, object_repr(value))
-    dict_repr = dict_repr[:-1] + "}"
-    return dict_repr
+    @classmethod
+    def last_line(cls, code):
+        """ Get the last line number of a code object, including its nested
+        code objects.
 
+        Parameters
+        ----------
+        code: code (mandatory)
+            a code object.
 
-def annotate(profiler, out, module_name, obj_code):
+        Returns
+        -------
+        last_lineno: int
+            the last line number found in the code line tables.
+        """
+        if hasattr(code, "co_lines"):
+            linenos = [lineno for _, _, lineno in code.co_lines()
+                       if lineno is not None]
+        else:
+            linenos = [lineno for _, lineno in dis.findlinestarts(code)]
+        last_lineno = max(linenos or [code.co_firstlineno])
+        for const in code.co_consts:
+            if isinstance(const, types.CodeType):
+                last_lineno = max(last_lineno, SourceRange.last_line(const))
+        return last_lineno
+
+    def timings(self, profiler):
+        """ Get the profiled timings of the source lines.
+
+        Parameters
+        ----------
+        profiler: object (mandatory)
+            a profiler backend.
+
+        Returns
+        -------
+        timings: list of 2-uplet
+            the number of hits and the duration of each source line.
+        """
+        hit_stats = profiler.hit_stats(self.filename)
+        if hit_stats is None or not profiler.total_time:
+            return [(0, 0)] * len(self.lines)
+        return [hit_stats(lineno) for lineno in range(
+            self.first_lineno, self.last_lineno + 1)]
+
+
+def annotate(profiler, out, source):
     """ Dump annotated input object source code with current profiling
     statistics to 'out' stream. Time unit is second.
 
     Parameters
     ----------
-    profiler: pprofile.Profile (mandatory)
-        a profiler.
+    profiler: object (mandatory)
+        a profiler backend.
     out: stream (mandatory)
         destination of annotated input object source code.
-    module_name:
-        the name of the module of interest (used to filter the execution list).
-    obj_code: list of str (mandatory)
-        the source code of the object of interest (used to filter the
-        execution list).
+    source: SourceRange (mandatory)
+        the source lines of the object of interest.
     """
-    # Get the full execution list that will be filtered
-    file_dict = profiler.file_dict
+    # Get the line by line execution information of the object of interest
     total_time = profiler.total_time
     if not total_time:
         return
+    timings = source.timings(profiler)
 
     # Define a function to compute pecentage
     def percent(value, scale):
@@ -245,44 +1021,24 @@ def annotate(profiler, out, module_name, obj_code):
             return 0
         return value * 100 / float(scale)
 
-    # Get all the file profiled
-    for name in profiler._getFileNameList(None):
-
-        # Select the module of interest and deal with '.py' '.pyc' extensions
-        if module_name.startswith(name):
-
-            # Get line by line execution information
-            file_timing = file_dict[name]
-            call_list_by_line = file_timing.getCallListByLine()
-
-            # Display the result table header
-            print(pprofile._ANNOTATE_HEADER, file=out)
-            print(pprofile._ANNOTATE_HORIZONTAL_LINE, file=out)
-
-            # Populate the table with the execution result
-            in_obj = False
-            for line_item in profiler._iterFile(name, call_list_by_line):
-
-                # Select the portion related to the called object
-                lineno, _, _, hits, duration, line = line_item
-                if line == obj_code[0]:
-                    in_obj = True
-
-                # Display the execution status
-                if in_obj:
-                    if hits:
-                        time_per_hit = duration / hits
-                    else:
-                        time_per_hit = 0
-                    print(pprofile._ANNOTATE_FORMAT % {
-                        "lineno": lineno,
-                        "hits": hits,
-                        "time": duration,
-                        "time_per_hit": time_per_hit,
-                        "percent": percent(duration, total_time),
-                        "line": line,
-                    }, end="", file=out),
-
-                # Select the portion related to the called object
-                if line == obj_code[-1]:
-                    in_obj = False
+    # Display the result table header
+    if profiler.estimated:
+        print("[bredala] Times estimated from {0} samples".format(
+            profiler.samples), file=out)
+    print(pprofile._ANNOTATE_HEADER, file=out)
+    print(pprofile._ANNOTATE_HORIZONTAL_LINE, file=out)
+
+    # Populate the table with the execution result
+    for index, (hits, duration) in enumerate(timings):
+        if hits:
+            time_per_hit = duration / hits
+        else:
+            time_per_hit = 0
+        print(pprofile._ANNOTATE_FORMAT % {
+            "lineno": source.first_lineno + index,
+            "hits": hits,
+            "time": duration,
+            "time_per_hit": time_per_hit,
+            "percent": percent(duration, total_time),
+            "line": source.lines[index].rstrip(),
+        }, file=out)
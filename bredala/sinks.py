@@ -0,0 +1,449 @@
+##########################################################################
+# Bredala - Copyright (C) AGrigis, 2015
+# Distributed under the terms of the CeCILL-B license, as published by
+# the CEA-CNRS-INRIA. Refer to the LICENSE file or to
+# http://www.cecill.info/licences/Licence_CeCILL-B_V1-en.html
+# for details.
+##########################################################################
+
+"""
+Module that defines where the decorated functions/methods records are
+written.
+
+The decorators push lightweight records to the current output sink. A record
+only needs a 'format' method that returns its text representation: the
+formatting and the I/O are done by the sink, possibly in a background thread.
+"""
+
+
+# System import
+import io
+import os
+import sys
+import json
+import atexit
+import itertools
+import queue
+import threading
+
+# Bredala import
+import bredala
+
+
+class StreamSink(object):
+    """ An output sink that synchronously writes the records in a stream.
+    """
+    def __init__(self, stream=None):
+        """ Initialize the StreamSink class.
+
+        Parameters
+        ----------
+        stream: stream (optional, default None)
+            destination of the records, default to the current stdout.
+        """
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def emit(self, record):
+        """ Write a record: the records written by concurrent threads are
+        not interleaved.
+
+        Parameters
+        ----------
+        record: object (mandatory)
+            a record with a 'format' method.
+        """
+        text = record.format()
+        stream = self.stream or sys.stdout
+        with self._lock:
+            stream.write(text)
+
+    def flush(self):
+        """ Flush the destination stream.
+        """
+        (self.stream or sys.stdout).flush()
+
+    def close(self):
+        """ Close the sink.
+        """
+        self.flush()
+
+
+class ThreadedSink(object):
+    """ An output sink that pushes the records on a bounded queue: a
+    background thread formats and writes them in batches.
+
+    When the queue is full, the overflow policy is applied: 'block' waits for
+    a free slot, 'drop' silently discards the record and 'count' discards the
+    record and reports the number of dropped records.
+    """
+    def __init__(self, stream=None, maxsize=10000, overflow="block",
+                 batch_size=256):
+        """ Initialize the ThreadedSink class.
+
+        Parameters
+        ----------
+        stream: stream (optional, default None)
+            destination of the records, default to stdout.
+        maxsize: int (optional, default 10000)
+            the maximum number of records waiting to be written.
+        overflow: str (optional, default 'block')
+            the overflow policy: 'block', 'drop' or 'count'.
+        batch_size: int (optional, default 256)
+            the maximum number of records written at once.
+        """
+        if overflow not in ("block", "drop", "count"):
+            raise ValueError("'{0}' overflow policy not recognized.".format(
+                overflow))
+        self.stream = stream or sys.stdout
+        self.overflow = overflow
+        self.batch_size = batch_size
+        self.dropped = 0
+        self._reported_dropped = 0
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = threading.Thread(target=self._run,
+                                        name="bredala-writer")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def emit(self, record):
+        """ Push a record on the queue.
+
+        Parameters
+        ----------
+        record: object (mandatory)
+            a record with a 'format' method.
+        """
+        if not self._thread.is_alive():
+            self.stream.write(record.format())
+            return
+        if self.overflow == "block":
+            self._queue.put(record)
+            return
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """ Wait until all the queued records are written.
+        """
+        if self._thread.is_alive():
+            self._queue.join()
+
+    def close(self):
+        """ Write the queued records and stop the background thread.
+        """
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _run(self):
+        """ Format and write the queued records in batches.
+        """
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            chunks = []
+            for record in batch:
+                if record is None:
+                    running = False
+                    continue
+                try:
+                    chunks.append(record.format())
+                except Exception as exc:
+                    chunks.append("[bredala] Record formatting failed: "
+                                  "{0}\n".format(exc))
+            if self.overflow == "count" and (
+                    self.dropped != self._reported_dropped):
+                chunks.append("[bredala] {0} records dropped\n".format(
+                    self.dropped - self._reported_dropped))
+                self._reported_dropped = self.dropped
+            try:
+                self.stream.write("".join(chunks))
+                self.stream.flush()
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+class TraceSink(object):
+    """ An output sink that writes the calls in a compact trace file.
+
+    The trace is in the JSON Lines format: the first line is a header, then
+    each called function/method qualified name is written once as a
+    '{"id": <id>, "name": <name>}' object and each call as a
+    '[<id>, <thread>, <start>, <end>, <status>]' list, optionally followed by
+    the truncated call signature. The 'start' and 'end' times are
+    'perf_counter_ns' times and 'status' is 'ok' or the name of the raised
+    exception class.
+
+    When the trace file size exceeds 'max_bytes', the file is rotated: the
+    current file is renamed with a '.1' suffix, the previous '.1' file with a
+    '.2' suffix and so on up to 'backup_count' files. Each file has its own
+    function table so that it can be read independently (see bredala.trace).
+
+    Only the end call records are written, the other records are ignored.
+    """
+    version = 1
+
+    def __init__(self, filename, max_bytes=100 * 1024 ** 2, backup_count=5,
+                 signatures=False, max_chars=200):
+        """ Initialize the TraceSink class.
+
+        Parameters
+        ----------
+        filename: str (mandatory)
+            the trace file, overwritten if it exists.
+        max_bytes: int (optional, default 100MB)
+            the trace file size that triggers a rotation, no rotation if None.
+        backup_count: int (optional, default 5)
+            the number of rotated trace files kept.
+        signatures: bool (optional, default False)
+            if True write the call signatures.
+        max_chars: int (optional, default 200)
+            the maximum number of characters of the written signatures.
+        """
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.signatures = signatures
+        self.max_chars = max_chars
+        self._lock = threading.Lock()
+        self._stream = None
+        self._open()
+
+    def emit(self, record):
+        """ Write a call in the trace.
+
+        Parameters
+        ----------
+        record: object (mandatory)
+            a record, only the end call records are written.
+        """
+        if getattr(record, "end", None) is None:
+            return
+        name = record.obj_name
+        call = [None, record.thread, record.start, record.end, record.status]
+        if self.signatures:
+            call.append(record.signature(self.max_chars))
+        with self._lock:
+            if self._stream is None:
+                return
+            function_id = self._functions.get(name)
+            if function_id is None:
+                function_id = len(self._functions)
+                self._functions[name] = function_id
+                self._write({"id": function_id, "name": name})
+            call[0] = function_id
+            self._write(call)
+            if self.max_bytes is not None and self._size >= self.max_bytes:
+                self._stream.close()
+                self._rotate()
+                self._open()
+
+    def flush(self):
+        """ Flush the trace file.
+        """
+        with self._lock:
+            if self._stream is not None:
+                self._stream.flush()
+
+    def close(self):
+        """ Close the trace file.
+        """
+        with self._lock:
+            if self._stream is not None:
+                self._stream.close()
+                self._stream = None
+
+    def _open(self):
+        """ Create a new trace file with an empty function table.
+        """
+        self._stream = io.open(self.filename, "wb")
+        self._functions = {}
+        self._size = 0
+        self._write({"bredala": "trace", "version": self.version,
+                     "pid": os.getpid()})
+
+    def _write(self, item):
+        """ Write one line in the trace file.
+        """
+        line = (json.dumps(item, separators=(",", ":")) + "\n").encode(
+            "utf-8")
+        self._stream.write(line)
+        self._size += len(line)
+
+    def _rotate(self):
+        """ Shift the rotated trace files.
+        """
+        if self.backup_count <= 0:
+            os.remove(self.filename)
+            return
+        for index in range(self.backup_count - 1, 0, -1):
+            source = "{0}.{1}".format(self.filename, index)
+            if os.path.isfile(source):
+                os.rename(source, "{0}.{1}".format(self.filename, index + 1))
+        os.rename(self.filename, self.filename + ".1")
+
+
+class ChromeTraceSink(object):
+    """ An output sink that streams the calls as Chrome Trace Event complete
+    'X' events, loadable in Perfetto or chrome://tracing.
+
+    The events are written in the JSON array format as soon as the calls
+    return: the nested calls of a thread are displayed as nested slices.
+    The coroutine and generator calls, that may overlap on their thread
+    without nesting, are written as async 'b'/'e' event pairs with their own
+    identifier, and displayed on their own tracks.
+    The array is closed when the sink is closed, but the viewers also accept
+    a truncated trace.
+
+    Only the end call records are written, the other records are ignored.
+    """
+    def __init__(self, filename, signatures=False, max_chars=200):
+        """ Initialize the ChromeTraceSink class.
+
+        Parameters
+        ----------
+        filename: str (mandatory)
+            the trace file, overwritten if it exists.
+        signatures: bool (optional, default False)
+            if True write the call signatures in the events arguments.
+        max_chars: int (optional, default 200)
+            the maximum number of characters of the written signatures.
+        """
+        self.filename = filename
+        self.signatures = signatures
+        self.max_chars = max_chars
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._threads = set()
+        self._ids = itertools.count(1)
+        self._stream = io.open(filename, "wb")
+        self._stream.write(b"[")
+        self._separator = b"\n"
+
+    def emit(self, record):
+        """ Write a call complete event, or an async event pair for a
+        coroutine or generator call.
+
+        Parameters
+        ----------
+        record: object (mandatory)
+            a record, only the end call records are written.
+        """
+        if getattr(record, "end", None) is None:
+            return
+        event = {
+            "name": record.obj_name, "cat": record.plan.package_name,
+            "ph": "X", "ts": record.start / 1000.,
+            "dur": (record.end - record.start) / 1000., "pid": self._pid,
+            "tid": record.thread, "args": {"status": record.status}}
+        if self.signatures:
+            event["args"]["signature"] = record.signature(self.max_chars)
+        if record.running is not None:
+            event["ph"] = "b"
+            event["id"] = "0x{0:x}".format(next(self._ids))
+            event["args"]["running"] = record.running / 1000.
+            if record.suspensions is not None:
+                event["args"]["suspensions"] = record.suspensions
+            else:
+                event["args"]["items"] = record.items
+            del event["dur"]
+            events = [event, {
+                "name": event["name"], "cat": event["cat"], "ph": "e",
+                "id": event["id"], "ts": record.end / 1000.,
+                "pid": self._pid, "tid": record.thread}]
+        else:
+            events = [event]
+        # The thread name is only known when the record is emitted by its
+        # own thread
+        named = False
+        if record.thread not in self._threads:
+            thread = threading.current_thread()
+            if thread.ident == record.thread:
+                events.insert(0, {
+                    "name": "thread_name", "ph": "M", "pid": self._pid,
+                    "tid": record.thread, "args": {"name": thread.name}})
+                named = True
+        data = ",\n".join([json.dumps(item, separators=(",", ":"))
+                           for item in events]).encode("utf-8")
+        with self._lock:
+            if self._stream is None:
+                return
+            if named:
+                self._threads.add(record.thread)
+            self._stream.write(self._separator + data)
+            self._separator = b",\n"
+
+    def flush(self):
+        """ Flush the trace file.
+        """
+        with self._lock:
+            if self._stream is not None:
+                self._stream.flush()
+
+    def close(self):
+        """ Close the events array and the trace file.
+        """
+        with self._lock:
+            if self._stream is not None:
+                self._stream.write(b"\n]\n")
+                self._stream.close()
+                self._stream = None
+
+
+def emit(record):
+    """ Push a record to the current output sink.
+
+    The sink errors are written on the standard error stream: they never
+    replace the returned value or the exception of a decorated call.
+
+    Parameters
+    ----------
+    record: object (mandatory)
+        a record with a 'format' method.
+    """
+    try:
+        bredala._sink.emit(record)
+    except Exception as exc:
+        sys.stderr.write("[bredala] Record emission failed: {0}\n".format(
+            exc))
+
+
+def set_sink(sink):
+    """ Define the current output sink: the previous one is closed.
+
+    Parameters
+    ----------
+    sink: object (mandatory)
+        an output sink, eg. StreamSink, ThreadedSink, TraceSink or
+        ChromeTraceSink.
+
+    Returns
+    -------
+    previous_sink: object
+        the previous output sink.
+    """
+    previous_sink = bredala._sink
+    bredala._sink = sink
+    if previous_sink is not None:
+        previous_sink.close()
+    return previous_sink
+
+
+def close_at_exit():
+    """ Write all the pending records at interpreter exit.
+    """
+    if bredala._sink is not None:
+        bredala._sink.close()
+
+
+set_sink(StreamSink())
+atexit.register(close_at_exit)
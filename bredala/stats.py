@@ -0,0 +1,625 @@
+##########################################################################
+# Bredala - Copyright (C) AGrigis, 2015
+# Distributed under the terms of the CeCILL-B license, as published by
+# the CEA-CNRS-INRIA. Refer to the LICENSE file or to
+# http://www.cecill.info/licences/Licence_CeCILL-B_V1-en.html
+# for details.
+##########################################################################
+
+"""
+Module that aggregates the decorated functions/methods execution times in
+memory and displays a summary report.
+"""
+
+
+# System import
+import os
+import sys
+import atexit
+import weakref
+import threading
+
+import pprofile
+
+# Bredala import
+import bredala
+
+
+# Upper bounds of the latency histogram buckets in seconds: the last bucket
+# collects all the longer calls
+BUCKETS = (1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1., 10.)
+BUCKET_LABELS = ("<1us", "<10us", "<100us", "<1ms", "<10ms", "<100ms", "<1s",
+                 "<10s", ">=10s")
+
+# The per-thread stack of the calls in progress and statistics buffer
+_local = threading.local()
+_lock = threading.Lock()
+
+# The number of calls and profiled calls displayed by the last report
+_reported = None
+
+
+class FunctionStats(object):
+    """ The execution statistics of a function or a class method.
+    """
+    def __init__(self, name):
+        """ Initialize the FunctionStats class.
+
+        Parameters
+        ----------
+        name: str (mandatory)
+            the qualified name of the function or class method.
+        """
+        self.name = name
+        self.count = 0
+        self.total = 0.
+        self.exclusive = 0.
+        self.running = 0.
+        self.suspensions = 0
+        self.coroutine = False
+        self.items = 0
+        self.generator = False
+        self.min = None
+        self.max = None
+        self.histogram = [0] * len(BUCKET_LABELS)
+
+    def record(self, duration, exclusive=None, running=None,
+               suspensions=0, items=None):
+        """ Record a call.
+
+        Parameters
+        ----------
+        duration: float (mandatory)
+            the call execution time in seconds.
+        exclusive: float (optional, default None)
+            the call execution time minus the time spent in the decorated
+            callees in seconds, default to 'duration'.
+        running: float (optional, default None)
+            for a coroutine, the time spent running on the event loop, for a
+            generator the time spent producing the items, in seconds.
+        suspensions: int (optional, default 0)
+            for a coroutine, the number of suspensions.
+        items: int (optional, default None)
+            for a generator, the number of yielded items.
+        """
+        self.count += 1
+        self.total += duration
+        self.exclusive += duration if exclusive is None else exclusive
+        if items is not None:
+            self.generator = True
+            self.running += running
+            self.items += items
+        elif running is not None:
+            self.coroutine = True
+            self.running += running
+            self.suspensions += suspensions
+        if self.min is None or duration < self.min:
+            self.min = duration
+        if self.max is None or duration > self.max:
+            self.max = duration
+        index = 0
+        for bound in BUCKETS:
+            if duration < bound:
+                break
+            index += 1
+        self.histogram[index] += 1
+
+    def merge(self, other):
+        """ Merge the statistics of another instance.
+
+        Parameters
+        ----------
+        other: FunctionStats (mandatory)
+            the statistics to be merged.
+        """
+        if other.count == 0:
+            return
+        self.count += other.count
+        self.total += other.total
+        self.exclusive += other.exclusive
+        self.running += other.running
+        self.suspensions += other.suspensions
+        self.coroutine = self.coroutine or other.coroutine
+        self.items += other.items
+        self.generator = self.generator or other.generator
+        if self.min is None or other.min < self.min:
+            self.min = other.min
+        if self.max is None or other.max > self.max:
+            self.max = other.max
+        self.histogram = [
+            a + b for a, b in zip(self.histogram, other.histogram)]
+
+    @property
+    def mean(self):
+        """ The mean execution time in seconds.
+        """
+        if self.count == 0:
+            return 0.
+        return self.total / self.count
+
+
+class EdgeStats(object):
+    """ The execution statistics of the calls of a function or a class method
+    from another one.
+    """
+    def __init__(self, caller, callee):
+        """ Initialize the EdgeStats class.
+
+        Parameters
+        ----------
+        caller: str (mandatory)
+            the qualified name of the calling function or class method.
+        callee: str (mandatory)
+            the qualified name of the called function or class method.
+        """
+        self.caller = caller
+        self.callee = callee
+        self.count = 0
+        self.inclusive = 0.
+        self.exclusive = 0.
+
+    def record(self, duration, exclusive):
+        """ Record a call.
+
+        Parameters
+        ----------
+        duration: float (mandatory)
+            the call execution time in seconds.
+        exclusive: float (mandatory)
+            the call execution time minus the time spent in the decorated
+            callees in seconds.
+        """
+        self.count += 1
+        self.inclusive += duration
+        self.exclusive += exclusive
+
+    def merge(self, other):
+        """ Merge the statistics of another instance.
+
+        Parameters
+        ----------
+        other: EdgeStats (mandatory)
+            the statistics to be merged.
+        """
+        self.count += other.count
+        self.inclusive += other.inclusive
+        self.exclusive += other.exclusive
+
+
+class LineProfile(object):
+    """ The line profile of a function or a class method merged over all
+    its profiled calls.
+    """
+    def __init__(self, name, first_lineno, source_lines):
+        """ Initialize the LineProfile class.
+
+        Parameters
+        ----------
+        name: str (mandatory)
+            the qualified name of the function or class method.
+        first_lineno: int (mandatory)
+            the line number of the first source line.
+        source_lines: list of str (mandatory)
+            the source code of the function or class method.
+        """
+        self.name = name
+        self.first_lineno = first_lineno
+        self.source_lines = source_lines
+        self.samples = 0
+        self.hits = [0] * len(source_lines)
+        self.durations = [0.] * len(source_lines)
+
+    def record(self, timings):
+        """ Record the line profile of a call.
+
+        Parameters
+        ----------
+        timings: list of 2-uplet (mandatory)
+            the number of hits and the duration of each source line.
+        """
+        self.samples += 1
+        for index, (hits, duration) in enumerate(timings):
+            self.hits[index] += hits
+            self.durations[index] += duration
+
+    def merge(self, other):
+        """ Merge the line profile of another instance.
+
+        Parameters
+        ----------
+        other: LineProfile (mandatory)
+            the line profile to be merged.
+        """
+        self.samples += other.samples
+        self.hits = [a + b for a, b in zip(self.hits, other.hits)]
+        self.durations = [
+            a + b for a, b in zip(self.durations, other.durations)]
+
+    def annotate(self, out):
+        """ Dump the annotated source code.
+
+        Parameters
+        ----------
+        out: stream (mandatory)
+            destination of the annotated source code.
+        """
+        total_time = sum(self.durations)
+        print("[bredala] Line profile of {0} ({1} profiled calls)".format(
+            self.name, self.samples), file=out)
+        print(pprofile._ANNOTATE_HEADER, file=out)
+        print(pprofile._ANNOTATE_HORIZONTAL_LINE, file=out)
+        for index, line in enumerate(self.source_lines):
+            hits = self.hits[index]
+            duration = self.durations[index]
+            print(pprofile._ANNOTATE_FORMAT % {
+                "lineno": self.first_lineno + index,
+                "hits": hits,
+                "time": duration,
+                "time_per_hit": duration / hits if hits else 0,
+                "percent": duration * 100 / total_time if total_time else 0,
+                "line": line.rstrip(),
+            }, file=out)
+
+
+class StatsBuffer(object):
+    """ The statistics recorded by a thread: each thread writes in its own
+    buffer without locking, the buffers are merged at report time (see
+    collect).
+    """
+    def __init__(self):
+        """ Initialize the StatsBuffer class.
+        """
+        self.stats = {}
+        self.edges = {}
+        self.profiles = {}
+
+    def merge(self, other):
+        """ Merge the statistics of another buffer.
+
+        Parameters
+        ----------
+        other: StatsBuffer (mandatory)
+            the statistics buffer to be merged.
+        """
+        for name, stats in list(other.stats.items()):
+            if name not in self.stats:
+                self.stats[name] = FunctionStats(name)
+            self.stats[name].merge(stats)
+        for key, edge in list(other.edges.items()):
+            if key not in self.edges:
+                self.edges[key] = EdgeStats(edge.caller, edge.callee)
+            self.edges[key].merge(edge)
+        for name, profile in list(other.profiles.items()):
+            if name not in self.profiles:
+                self.profiles[name] = LineProfile(
+                    name, profile.first_lineno, profile.source_lines)
+            self.profiles[name].merge(profile)
+
+    def clear(self):
+        """ Clear the statistics.
+        """
+        self.stats.clear()
+        self.edges.clear()
+        self.profiles.clear()
+
+
+class ThreadSentinel(object):
+    """ A thread-local object released when its thread finishes: the thread
+    statistics buffer is then retired (see retire_buffer).
+    """
+
+
+# The statistics of the finished threads
+_retired = StatsBuffer()
+bredala._buffers.append(_retired)
+
+
+def get_buffer():
+    """ Get the current thread statistics buffer.
+
+    Returns
+    -------
+    buffer: StatsBuffer
+        the current thread statistics buffer.
+    """
+    try:
+        return _local.buffer
+    except AttributeError:
+        stats_buffer = _local.buffer = StatsBuffer()
+        _local.sentinel = ThreadSentinel()
+        with _lock:
+            bredala._buffers.append(stats_buffer)
+        finalizer = weakref.finalize(
+            _local.sentinel, retire_buffer, stats_buffer)
+        finalizer.atexit = False
+        return stats_buffer
+
+
+def retire_buffer(stats_buffer):
+    """ Merge the statistics buffer of a finished thread in the retired
+    threads buffer, so that the buffers of the short-lived threads are
+    released.
+
+    Parameters
+    ----------
+    stats_buffer: StatsBuffer (mandatory)
+        the statistics buffer of the finished thread.
+    """
+    with _lock:
+        if stats_buffer not in bredala._buffers:
+            return
+        _retired.merge(stats_buffer)
+        bredala._buffers.remove(stats_buffer)
+
+
+def record(name, duration, exclusive=None, caller=None, running=None,
+           suspensions=0, items=None):
+    """ Record a call in the current thread statistics buffer.
+
+    Parameters
+    ----------
+    name: str (mandatory)
+        the qualified name of the called function or class method.
+    duration: float (mandatory)
+        the call execution time in seconds.
+    exclusive: float (optional, default None)
+        the call execution time minus the time spent in the decorated callees
+        in seconds, default to 'duration'.
+    caller: str (optional, default None)
+        the qualified name of the decorated calling function or class
+        method if any.
+    running: float (optional, default None)
+        for a coroutine, the time spent running on the event loop, for a
+        generator the time spent producing the items, in seconds.
+    suspensions: int (optional, default 0)
+        for a coroutine, the number of suspensions.
+    items: int (optional, default None)
+        for a generator, the number of yielded items.
+    """
+    stats_buffer = get_buffer()
+    stats = stats_buffer.stats.get(name)
+    if stats is None:
+        stats = stats_buffer.stats[name] = FunctionStats(name)
+    stats.record(duration, exclusive, running, suspensions, items)
+    if caller is not None:
+        key = (caller, name)
+        edge = stats_buffer.edges.get(key)
+        if edge is None:
+            edge = stats_buffer.edges[key] = EdgeStats(caller, name)
+        edge.record(duration, duration if exclusive is None else exclusive)
+
+
+def push_call(name):
+    """ Push a call on the current thread call stack.
+
+    Parameters
+    ----------
+    name: str (mandatory)
+        the qualified name of the called function or class method.
+    """
+    try:
+        frames = _local.frames
+    except AttributeError:
+        frames = _local.frames = []
+    frames.append([name, 0.])
+
+
+def pop_call(duration):
+    """ Pop the last call of the current thread call stack and record it
+    with its exclusive time and its caller.
+
+    Parameters
+    ----------
+    duration: float (mandatory)
+        the call execution time in seconds.
+    """
+    frames = _local.frames
+    name, children_duration = frames.pop()
+    caller = None
+    if len(frames) > 0:
+        frames[-1][1] += duration
+        caller = frames[-1][0]
+    record(name, duration, duration - children_duration, caller)
+
+
+def record_profile(name, first_lineno, source_lines, timings):
+    """ Merge the line profile of a call in the current thread statistics
+    buffer.
+
+    Parameters
+    ----------
+    name: str (mandatory)
+        the qualified name of the called function or class method.
+    first_lineno: int (mandatory)
+        the line number of the first source line.
+    source_lines: list of str (mandatory)
+        the source code of the function or class method.
+    timings: list of 2-uplet (mandatory)
+        the number of hits and the duration of each source line.
+    """
+    stats_buffer = get_buffer()
+    profile = stats_buffer.profiles.get(name)
+    if profile is None:
+        profile = stats_buffer.profiles[name] = LineProfile(
+            name, first_lineno, source_lines)
+    profile.record(timings)
+
+
+def collect(processes=True):
+    """ Merge the threads statistics buffers in the 'bredala._stats',
+    'bredala._edges' and 'bredala._profiles' registries.
+
+    The buffers are read without locking: the calls in progress in the other
+    threads may be partially accounted.
+
+    Parameters
+    ----------
+    processes: bool (optional, default True)
+        if True also merge the statistics dumped by the child processes (see
+        bredala.enable_process_stats).
+    """
+    merged_buffer = StatsBuffer()
+    with _lock:
+        buffers = list(bredala._buffers)
+    if processes and bredala._process_stats is not None:
+        buffers.extend(bredala._process_stats.load())
+    for stats_buffer in buffers:
+        merged_buffer.merge(stats_buffer)
+    for registry, merged in ((bredala._stats, merged_buffer.stats),
+                             (bredala._edges, merged_buffer.edges),
+                             (bredala._profiles, merged_buffer.profiles)):
+        registry.clear()
+        registry.update(merged)
+
+
+def reset_after_fork():
+    """ Clear the statistics inherited from the parent process in a forked
+    child process.
+    """
+    global _lock
+    _lock = threading.Lock()
+    stats_buffer = getattr(_local, "buffer", None)
+    del bredala._buffers[:]
+    _retired.clear()
+    bredala._buffers.append(_retired)
+    if stats_buffer is not None:
+        stats_buffer.clear()
+        bredala._buffers.append(stats_buffer)
+    bredala._stats.clear()
+    bredala._edges.clear()
+    bredala._profiles.clear()
+
+
+def recorded():
+    """ Count the collected calls and profiled calls.
+
+    Returns
+    -------
+    counts: 2-uplet
+        the number of collected calls and profiled calls.
+    """
+    return (sum([stats.count for stats in bredala._stats.values()]),
+            sum([profile.samples for profile in bredala._profiles.values()]))
+
+
+def reset():
+    """ Clear all the recorded statistics.
+    """
+    global _reported
+    _reported = None
+    with _lock:
+        for stats_buffer in bredala._buffers:
+            stats_buffer.clear()
+    if bredala._process_stats is not None:
+        bredala._process_stats.clear()
+    bredala._stats.clear()
+    bredala._edges.clear()
+    bredala._profiles.clear()
+
+
+def report(out=None, sort="total"):
+    """ Display the aggregated statistics summary table.
+
+    Parameters
+    ----------
+    out: stream (optional, default None)
+        destination of the report, default to stdout.
+    sort: str (optional, default 'total')
+        the statistic used to sort the functions in decreasing order:
+        'total', 'exclusive', 'count', 'mean', 'min' or 'max'.
+    """
+    global _reported
+    if sort not in ("total", "exclusive", "count", "mean", "min", "max"):
+        raise ValueError("'{0}' sort key not recognized.".format(sort))
+    out = out or sys.stdout
+    collect()
+    _reported = recorded()
+    all_stats = sorted(bredala._stats.values(),
+                       key=lambda item: getattr(item, sort), reverse=True)
+    print("{0}\n[bredala] Statistics summary".format(80 * "_"), file=out)
+    print("{0:>10}|{1:>13}|{2:>13}|{3:>13}|{4:>13}|{5:>13}|Function".format(
+        "Calls", "Total", "Exclusive", "Mean", "Min", "Max"), file=out)
+    print("{0}+{1}+{1}+{1}+{1}+{1}+{2}".format(10 * "-", 13 * "-", 8 * "-"),
+          file=out)
+    noisy = False
+    for stats in all_stats:
+        # Flag the functions whose mean execution time cannot be told apart
+        # from the timing overhead
+        flag = ""
+        if bredala._calibration.is_noise(stats.mean):
+            flag = "~"
+            noisy = True
+        print("{0:>10}|{1:>13.6g}|{2:>13.6g}|{3:>13.6g}|{4:>13.6g}|"
+              "{5:>13.6g}|{6}{7}".format(
+                  stats.count, stats.total, stats.exclusive, stats.mean,
+                  stats.min, stats.max, flag, stats.name), file=out)
+    if noisy:
+        print("[bredala] ~ mean execution time within the noise floor "
+              "({0}ns, {1}ns timing overhead subtracted)".format(
+                  bredala._calibration.noise_floor,
+                  bredala._calibration.overhead), file=out)
+    print("[bredala] Latency histogram", file=out)
+    print("|".join(["{0:>7}".format(label) for label in BUCKET_LABELS]) +
+          "|Function", file=out)
+    print("+".join(len(BUCKET_LABELS) * [7 * "-"]) + "+" + 8 * "-",
+          file=out)
+    for stats in all_stats:
+        print("|".join(["{0:>7}".format(count)
+                        for count in stats.histogram]) +
+              "|" + stats.name, file=out)
+    coroutine_stats = [stats for stats in all_stats if stats.coroutine]
+    if len(coroutine_stats) > 0:
+        print("[bredala] Coroutines", file=out)
+        print("{0:>10}|{1:>13}|{2:>13}|{3:>13}|Function".format(
+            "Calls", "Elapsed", "Running", "Suspensions"), file=out)
+        print("{0}+{1}+{1}+{1}+{2}".format(10 * "-", 13 * "-", 8 * "-"),
+              file=out)
+        for stats in coroutine_stats:
+            print("{0:>10}|{1:>13.6g}|{2:>13.6g}|{3:>13}|{4}".format(
+                stats.count, stats.total, stats.running, stats.suspensions,
+                stats.name), file=out)
+    generator_stats = [stats for stats in all_stats if stats.generator]
+    if len(generator_stats) > 0:
+        print("[bredala] Generators", file=out)
+        print("{0:>10}|{1:>13}|{2:>13}|{3:>13}|{4:>13}|Function".format(
+            "Calls", "Elapsed", "Running", "Items", "Per item"), file=out)
+        print("{0}+{1}+{1}+{1}+{1}+{2}".format(10 * "-", 13 * "-", 8 * "-"),
+              file=out)
+        for stats in generator_stats:
+            print("{0:>10}|{1:>13.6g}|{2:>13.6g}|{3:>13}|{4:>13.6g}|"
+                  "{5}".format(stats.count, stats.total, stats.running,
+                               stats.items,
+                               stats.running / max(stats.items, 1),
+                               stats.name), file=out)
+    if len(bredala._edges) > 0:
+        print("[bredala] Call graph", file=out)
+        print("{0:>10}|{1:>13}|{2:>13}|Caller -> Function".format(
+            "Calls", "Inclusive", "Exclusive"), file=out)
+        print("{0}+{1}+{1}+{2}".format(10 * "-", 13 * "-", 18 * "-"),
+              file=out)
+        for edge in sorted(bredala._edges.values(),
+                           key=lambda item: item.inclusive, reverse=True):
+            print("{0:>10}|{1:>13.6g}|{2:>13.6g}|{3} -> {4}".format(
+                edge.count, edge.inclusive, edge.exclusive, edge.caller,
+                edge.callee), file=out)
+    for name in sorted(bredala._profiles):
+        bredala._profiles[name].annotate(out)
+    print(80 * "_", file=out)
+
+
+def report_at_exit():
+    """ Display the statistics summary table at interpreter exit if calls
+    or line profiles have been recorded since the last report, except in the
+    child processes whose statistics are collected by the parent process.
+    """
+    if bredala._process_stats is not None and bredala._process_stats.child:
+        return
+    collect()
+    if ((len(bredala._stats) > 0 or len(bredala._profiles) > 0) and
+            recorded() != _reported):
+        report()
+
+
+atexit.register(report_at_exit)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reset_after_fork)
@@ -0,0 +1,101 @@
+##########################################################################
+# Bredala - Copyright (C) AGrigis, 2015
+# Distributed under the terms of the CeCILL-B license, as published by
+# the CEA-CNRS-INRIA. Refer to the LICENSE file or to
+# http://www.cecill.info/licences/Licence_CeCILL-B_V1-en.html
+# for details.
+##########################################################################
+
+# System import
+import asyncio
+import inspect
+import unittest
+
+# Bredala import
+import bredala
+from bredala.signaturedecorator import bredala_signature
+from bredala.sinks import set_sink
+from bredala.stats import collect
+from bredala.stats import reset
+from bredala.test.support import ListSink
+
+
+async def handler(delay, nb_sleeps=2):
+    """ Coroutine function used for tests.
+    """
+    for _ in range(nb_sleeps):
+        await asyncio.sleep(delay)
+    if delay < 0:
+        raise ValueError("Negative delay.")
+    return delay
+
+
+class TestCoroutines(unittest.TestCase):
+    """ Test the coroutine functions decoration.
+    """
+    def setUp(self):
+        """ Clear the recorded statistics.
+        """
+        reset()
+
+    def tearDown(self):
+        """ Clear the recorded statistics.
+        """
+        reset()
+
+    def test_aggregate(self):
+        """ Method to test the aggregated elapsed/running times and
+        suspensions.
+        """
+        decorated_func = bredala_signature(handler, aggregate=True)
+        self.assertTrue(inspect.iscoroutinefunction(decorated_func))
+        self.assertTrue(asyncio.iscoroutinefunction(decorated_func))
+        coroutine = decorated_func(0.)
+        self.assertTrue(asyncio.iscoroutine(coroutine))
+        coroutine.close()
+
+        async def main():
+            return await asyncio.gather(
+                decorated_func(0.02), asyncio.ensure_future(
+                    decorated_func(0.02)))
+
+        self.assertEqual(asyncio.run(main()), [0.02, 0.02])
+        collect()
+        stats = bredala._stats[handler.__module__ + ".handler"]
+        self.assertEqual(stats.count, 2)
+        self.assertTrue(stats.coroutine)
+        self.assertEqual(stats.suspensions, 4)
+        self.assertTrue(stats.total >= 0.08)
+        self.assertTrue(stats.running < stats.total / 2)
+
+    def test_records(self):
+        """ Method to test the emitted records and the raised exceptions.
+        """
+        sink = ListSink()
+        previous_sink = set_sink(sink)
+        try:
+            decorated_func = bredala_signature(handler)
+            self.assertEqual(asyncio.run(decorated_func(0., 1)), 0.)
+            self.assertRaises(ValueError, asyncio.run,
+                              decorated_func(-1., 0))
+        finally:
+            set_sink(previous_sink)
+        self.assertEqual(len(sink.records), 4)
+        self.assertIn("handler(delay=0.0, nb_sleeps=1)",
+                      sink.records[0].format())
+        self.assertEqual(sink.records[1].suspensions, 1)
+        self.assertIn("1 suspensions", sink.records[1].format())
+        self.assertIsNone(sink.records[1].profile)
+        self.assertEqual(sink.records[3].status, "ValueError")
+
+
+def test():
+    """ Function to execute unitests.
+    """
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestCoroutines)
+    runtime = unittest.TextTestRunner(verbosity=2).run(suite)
+    return runtime.wasSuccessful()
+
+
+if __name__ == "__main__":
+    test()
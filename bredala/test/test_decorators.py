@@ -13,6 +13,8 @@ import numpy
 
 # Package import
 from bredala.demo.myfunctions import mytype
+from bredala.demo.myclasses import Square
+from bredala.exceptions import InvalidType
 from bredala.exceptions import ArgumentValidationError
 from bredala.exceptions import InvalidArgumentNumberError
 from bredala.exceptions import InvalidReturnType
@@ -46,6 +48,45 @@ class TestDecorators(unittest.TestCase):
         decorated_func = returns(float)(inputs(float, float)(mytype))
         self.assertRaises(InvalidReturnType, decorated_func, 10., 10.)
 
+    def test_registration_raises(self):
+        """ Method to test that invalid types are detected at registration
+        time.
+        """
+        self.assertRaises(InvalidType, inputs, float, "float")
+        self.assertRaises(InvalidType, inputs, numpy.ndarray)
+        self.assertRaises(InvalidType, returns, "self")
+
+    def test_keyword_exec(self):
+        """ Method to test the validation of keyword arguments.
+        """
+        decorated_func = inputs(float, float)(mytype)
+        self.assertEqual(decorated_func(10., optional=10), repr(float))
+        self.assertRaises(ArgumentValidationError, decorated_func, 10,
+                          optional=10.)
+        self.assertRaises(InvalidArgumentNumberError, decorated_func,
+                          param=10.)
+
+    def test_method_exec(self):
+        """ Method to test that the 'self' slot is not checked.
+        """
+        decorated_func = returns(int)(inputs("self", int)(Square.area))
+        self.assertEqual(decorated_func(Square("my_square"), 2), 4)
+        self.assertRaises(ArgumentValidationError, decorated_func,
+                          Square("my_square"), 2.)
+
+    def test_returns_exec(self):
+        """ Method to test the validation of multiple or empty returned
+        values.
+        """
+        decorated_func = returns(int, str)(lambda: (1, "a"))
+        self.assertEqual(decorated_func(), (1, "a"))
+        decorated_func = returns(int, str)(lambda: (1, 2))
+        self.assertRaises(InvalidReturnType, decorated_func)
+        decorated_func = returns()(lambda: None)
+        self.assertIsNone(decorated_func())
+        decorated_func = returns(tuple)(lambda: ((1, 2), ))
+        self.assertEqual(decorated_func(), ((1, 2), ))
+
     def test_normal_exec(self):
         """ Method to test the normal exception.
         """
@@ -0,0 +1,246 @@
+##########################################################################
+# Bredala - Copyright (C) AGrigis, 2015
+# Distributed under the terms of the CeCILL-B license, as published by
+# the CEA-CNRS-INRIA. Refer to the LICENSE file or to
+# http://www.cecill.info/licences/Licence_CeCILL-B_V1-en.html
+# for details.
+##########################################################################
+
+# System import
+import os
+import sys
+import types
+import shutil
+import inspect
+import tempfile
+import importlib
+import unittest
+
+# Bredala import
+import bredala
+from bredala.modulehacker import BredalaMetaImportHook
+from bredala.modulehacker import BredalaLoader
+from bredala.registry import ModuleTrie
+from bredala.signaturedecorator import Switch
+
+
+MODULE_SOURCE = '''
+def addition(a, b):
+    return a + b
+
+
+def substraction(a, b):
+    return a - b
+
+
+class DataLoader(object):
+    def load_data(self):
+        return 1
+
+    def save_data(self):
+        return 2
+'''
+
+
+def is_wrapper(obj):
+    """ Check if an object is decorated by bredala_signature.
+    """
+    return isinstance(getattr(obj, "switch", None), Switch)
+
+
+class TestImport(unittest.TestCase):
+    """ Test the registered modules import hook.
+    """
+    def setUp(self):
+        """ Create a package and a namespace package.
+        """
+        self.tmpdir = tempfile.mkdtemp()
+        for package, init in (("bredalapkg", True), ("bredalans", False),
+                              ("bredalaglob", True),
+                              (os.path.join("bredalaglob", "sub"), True),
+                              ("bredalalive", True)):
+            os.mkdir(os.path.join(self.tmpdir, package))
+            if init:
+                with open(os.path.join(self.tmpdir, package, "__init__.py"),
+                          "wt") as open_file:
+                    open_file.write("")
+            with open(os.path.join(self.tmpdir, package, "mod.py"),
+                      "wt") as open_file:
+                open_file.write(MODULE_SOURCE)
+        with open(os.path.join(self.tmpdir, "bredalalive", "user.py"),
+                  "wt") as open_file:
+            open_file.write("from bredalalive.mod import addition\n")
+        self.patterns = bredala._patterns
+        bredala._patterns = ModuleTrie()
+        sys.path.insert(0, self.tmpdir)
+        importlib.invalidate_caches()
+        self.names = ["bredalapkg", "bredalapkg.mod", "bredalans",
+                      "bredalans.mod"]
+        for name in self.names:
+            bredala.register(name, verbosity="off")
+
+    def tearDown(self):
+        """ Remove the created packages.
+        """
+        sys.path.remove(self.tmpdir)
+        bredala._patterns = self.patterns
+        for name in self.names + ["bredalaglob", "bredalaglob.mod",
+                                  "bredalaglob.sub", "bredalaglob.sub.mod",
+                                  "bredalalive", "bredalalive.mod",
+                                  "bredalalive.user"]:
+            bredala._modules.pop(name, None)
+            sys.modules.pop(name, None)
+        shutil.rmtree(self.tmpdir)
+
+    def test_import(self):
+        """ Method to test that the registered modules are executed by their
+        original loader and then decorated.
+        """
+        for name in ("bredalapkg.mod", "bredalans.mod"):
+            module = importlib.import_module(name)
+            self.assertTrue(is_wrapper(module.addition))
+            self.assertEqual(module.addition(1, 2), 3)
+            self.assertIsInstance(module.__loader__, BredalaLoader)
+            self.assertEqual(module.__file__, os.path.join(
+                self.tmpdir, name.replace(".", os.sep) + ".py"))
+            self.assertTrue(sys.dont_write_bytecode or
+                            os.path.isfile(module.__cached__))
+            self.assertIn("return a + b", inspect.getsource(module))
+        self.assertEqual(sys.modules["bredalans"].__path__._path,
+                         [os.path.join(self.tmpdir, "bredalans")])
+        self.assertIsNone(BredalaMetaImportHook().find_spec("os", None))
+
+    def test_module_trie(self):
+        """ Method to test the module patterns matching.
+        """
+        trie = ModuleTrie()
+        for index, pattern in enumerate(("pkg.*", "pkg.**", "pkg.s?b.io",
+                                         "other")):
+            trie.insert(pattern, index)
+        self.assertRaises(ValueError, trie.insert, "pkg.**.io", 4)
+        self.assertEqual(trie.match("pkg"), [])
+        self.assertEqual(sorted(trie.match("pkg.io")), [0, 1])
+        self.assertEqual(trie.match("pkg.sub.io"), [1, 2])
+        self.assertEqual(trie.match("pkg.sub.deep.io"), [1])
+        self.assertEqual(trie.match("other"), [3])
+        self.assertEqual(trie.match("numpy.linalg"), [])
+
+    def test_patterns(self):
+        """ Method to test the module and function/method patterns
+        registration.
+        """
+        bredala.register("bredalaglob.*", names=["add*"], verbosity="off")
+        bredala.register("bredalaglob.**", names=["*Loader.load*"],
+                         verbosity="off")
+        module = importlib.import_module("bredalaglob.mod")
+        self.assertTrue(is_wrapper(module.addition))
+        self.assertFalse(is_wrapper(module.substraction))
+        self.assertTrue(is_wrapper(module.DataLoader.load_data))
+        self.assertFalse(is_wrapper(module.DataLoader.save_data))
+        self.assertEqual(module.DataLoader().load_data(), 1)
+        module = importlib.import_module("bredalaglob.sub.mod")
+        self.assertFalse(is_wrapper(module.addition))
+        self.assertTrue(is_wrapper(module.DataLoader.load_data))
+        self.assertNotIsInstance(sys.modules["bredalaglob"].__loader__,
+                                 BredalaLoader)
+
+    def test_attach(self):
+        """ Method to test the decoration of imported modules and the
+        restoration of the original functions/methods.
+        """
+        module = importlib.import_module("bredalalive.mod")
+        user = importlib.import_module("bredalalive.user")
+        addition = module.addition
+        load_data = vars(module.DataLoader)["load_data"]
+        bredala.attach("bredalalive.mod", verbosity="off")
+        self.assertTrue(is_wrapper(module.addition))
+        self.assertIs(user.addition, module.addition)
+        self.assertTrue(is_wrapper(module.DataLoader.load_data))
+        self.assertEqual(module.DataLoader().load_data(), 1)
+        bredala.detach("bredalalive.mod")
+        self.assertIs(module.addition, addition)
+        self.assertIs(user.addition, addition)
+        self.assertIs(vars(module.DataLoader)["load_data"], load_data)
+        self.assertNotIn("bredalalive.mod", bredala._modules)
+        self.assertEqual([patch for patch in bredala._patches
+                          if patch.module_name.startswith("bredalalive")],
+                         [])
+
+    def test_attach_decorated(self):
+        """ Method to test that the decorated functions/methods are not
+        decorated twice.
+        """
+        module = importlib.import_module("bredalapkg.mod")
+        wrapper = module.addition
+        patches = list(bredala._patches)
+        bredala.attach("bredalapkg.mod", verbosity="off")
+        self.assertIs(module.addition, wrapper)
+        self.assertEqual(bredala._patches, patches)
+        module = importlib.import_module("bredalalive.mod")
+        user = importlib.import_module("bredalalive.user")
+        addition = module.addition
+        bredala.attach("bredalalive.mod", verbosity="off")
+        wrapper = module.addition
+        load_data = module.DataLoader.load_data
+        patches = list(bredala._patches)
+        try:
+            bredala.attach("bredalalive.mod", verbosity="off")
+            self.assertIs(module.addition, wrapper)
+            self.assertIs(user.addition, wrapper)
+            self.assertIs(module.DataLoader.load_data, load_data)
+            self.assertEqual(bredala._patches, patches)
+        finally:
+            bredala.detach("bredalalive.mod")
+        self.assertIs(module.addition, addition)
+        self.assertIs(user.addition, addition)
+
+    def test_toggle(self):
+        """ Method to test the runtime instrumentation switch.
+        """
+        module = importlib.import_module("bredalalive.mod")
+        addition = module.addition
+        bredala.attach("bredalalive.mod", verbosity="off")
+        wrapper = module.addition
+        holder = types.ModuleType("bredalaholder")
+        holder.addition = wrapper
+        sys.modules[holder.__name__] = holder
+        try:
+            bredala.disable("bredalalive.mod.addition")
+            self.assertFalse(wrapper.switch.active)
+            self.assertIs(module.addition, addition)
+            self.assertIs(holder.addition, addition)
+            self.assertTrue(is_wrapper(module.DataLoader.load_data))
+            self.assertEqual(wrapper(1, 2), 3)
+            late_user = importlib.import_module("bredalalive.user")
+            self.assertIs(late_user.addition, addition)
+            bredala.enable("bredalalive.mod.*")
+            self.assertIs(module.addition, wrapper)
+            self.assertIs(holder.addition, wrapper)
+            self.assertIs(late_user.addition, wrapper)
+            bredala.disable()
+            self.assertFalse(bredala.is_enabled())
+            self.assertIs(module.addition, addition)
+            self.assertFalse(is_wrapper(
+                vars(module.DataLoader)["load_data"]))
+            self.assertEqual(module.DataLoader().load_data(), 1)
+            bredala.enable()
+            self.assertIs(module.addition, wrapper)
+            self.assertTrue(is_wrapper(module.DataLoader.load_data))
+        finally:
+            bredala.enable()
+            bredala.detach("bredalalive.mod")
+            del sys.modules[holder.__name__]
+        self.assertIs(module.addition, addition)
+        self.assertIs(holder.addition, addition)
+
+
+def test():
+    """ Function to execute unitests.
+    """
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestImport)
+    runtime = unittest.TextTestRunner(verbosity=2).run(suite)
+    return runtime.wasSuccessful()
+
+
+if __name__ == "__main__":
+    test()
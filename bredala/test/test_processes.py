@@ -0,0 +1,115 @@
+##########################################################################
+# Bredala - Copyright (C) AGrigis, 2015
+# Distributed under the terms of the CeCILL-B license, as published by
+# the CEA-CNRS-INRIA. Refer to the LICENSE file or to
+# http://www.cecill.info/licences/Licence_CeCILL-B_V1-en.html
+# for details.
+##########################################################################
+
+# System import
+import os
+import sys
+import glob
+import shutil
+import tempfile
+import subprocess
+import unittest
+import multiprocessing
+
+# Bredala import
+import bredala
+from bredala.processes import enable_process_stats
+from bredala.processes import STATS_DIR_ENV
+from bredala.signaturedecorator import bredala_signature
+from bredala.stats import collect
+from bredala.stats import reset
+from bredala.test.support import addition
+
+
+decorated_addition = bredala_signature(addition, aggregate=True)
+
+
+def work(value):
+    """ Function executed in the child processes.
+    """
+    return decorated_addition(value, 1)
+
+
+class TestProcesses(unittest.TestCase):
+    """ Test the child processes statistics collection.
+    """
+    def setUp(self):
+        """ Collect the child processes statistics in a temporary directory.
+        """
+        reset()
+        self.directory = enable_process_stats(tempfile.mkdtemp())
+
+    def tearDown(self):
+        """ Stop the child processes statistics collection.
+        """
+        del os.environ[STATS_DIR_ENV]
+        bredala._process_stats = None
+        shutil.rmtree(self.directory)
+        reset()
+
+    def test_pool(self):
+        """ Method to test that the calls made by pool workers are merged in
+        the parent report.
+        """
+        decorated_addition(1, 1)
+        for method in ("fork", "spawn"):
+            if method not in multiprocessing.get_all_start_methods():
+                continue
+            pool = multiprocessing.get_context(method).Pool(2)
+            self.assertEqual(pool.map(work, range(20)), list(range(1, 21)))
+            pool.close()
+            pool.join()
+        nb_methods = len(set(("fork", "spawn")) &
+                         set(multiprocessing.get_all_start_methods()))
+        collect()
+        self.assertEqual(self.count_additions(), 1 + 20 * nb_methods)
+        self.assertEqual(glob.glob(os.path.join(self.directory, "*")), [])
+        collect()
+        self.assertEqual(self.count_additions(), 1 + 20 * nb_methods)
+        collect(processes=False)
+        self.assertEqual(self.count_additions(), 1)
+
+    def test_unique_files(self):
+        """ Method to test that the statistics files of the processes with
+        the same identifier do not overwrite each other.
+        """
+        for _ in range(2):
+            decorated_addition(1, 1)
+            bredala._process_stats.dump()
+            reset()
+        self.assertEqual(
+            len(glob.glob(os.path.join(self.directory, "*.pkl"))), 2)
+
+    def test_unrelated_process(self):
+        """ Method to test that the processes started with the statistics
+        directory environment, but not by 'multiprocessing', are not child
+        processes.
+        """
+        output = subprocess.check_output([
+            sys.executable, "-c",
+            "import bredala; print(bredala._process_stats)"])
+        self.assertEqual(output.strip(), b"None")
+
+    def count_additions(self):
+        """ Count the recorded calls: the spawned processes may import this
+        module with another name.
+        """
+        return sum([stats.count for name, stats in bredala._stats.items()
+                    if name.endswith(".addition")])
+
+
+def test():
+    """ Function to execute unitests.
+    """
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestProcesses)
+    runtime = unittest.TextTestRunner(verbosity=2).run(suite)
+    return runtime.wasSuccessful()
+
+
+if __name__ == "__main__":
+    test()
@@ -0,0 +1,212 @@
+##########################################################################
+# Bredala - Copyright (C) AGrigis, 2015
+# Distributed under the terms of the CeCILL-B license, as published by
+# the CEA-CNRS-INRIA. Refer to the LICENSE file or to
+# http://www.cecill.info/licences/Licence_CeCILL-B_V1-en.html
+# for details.
+##########################################################################
+
+# System import
+import unittest
+import time
+import inspect
+from io import StringIO
+
+# Bredala import
+from bredala.profilers import DeterministicProfiler
+from bredala.profilers import StatisticalProfiler
+from bredala.profilers import TargetedProfiler
+from bredala.profilers import get_profiler
+from bredala.signaturedecorator import annotate
+from bredala.signaturedecorator import bredala_signature
+from bredala.sinks import set_sink
+from bredala.signaturedecorator import SourceRange
+from bredala.test.support import ListSink
+
+
+def busy(duration):
+    """ Function that keeps the CPU busy.
+    """
+    start_time = time.time()
+    while time.time() - start_time < duration:
+        pass
+    return duration
+
+
+def helper(value):
+    """ Function called by the profiled function.
+    """
+    return value + 1
+
+
+def caller(value):
+    """ Function that calls an helper function.
+    """
+    value = helper(value)
+    if value < 0:
+        raise ValueError("Negative value.")
+    return value
+
+
+def countdown(value):
+    """ Recursive function.
+    """
+    if value > 0:
+        return decorated_countdown(value - 1)
+    return value
+
+
+def busy_sum(value):
+    """ Recursive function that keeps the CPU busy.
+    """
+    busy(0.002)
+    if value > 0:
+        return value + busy_sum(value - 1)
+    return value
+
+
+def nested_caller(value):
+    """ Function that calls a decorated function.
+    """
+    return decorated_helper(value)
+
+
+class CountingProfiler(TargetedProfiler):
+    """ A backend that counts its instances.
+    """
+    instances = 0
+
+    def __init__(self, codes=None):
+        CountingProfiler.instances += 1
+        TargetedProfiler.__init__(self, codes)
+
+
+decorated_countdown = bredala_signature(
+    countdown, profiler_backend=CountingProfiler)
+decorated_helper = bredala_signature(helper)
+
+
+class TestProfilers(unittest.TestCase):
+    """ Test the line profiler backends.
+    """
+    def setUp(self):
+        """ Get the profiled function source.
+        """
+        self.source_lines, self.first_lineno = inspect.getsourcelines(busy)
+        self.loop_lineno = self.first_lineno + 4
+
+    def test_get_profiler(self):
+        """ Method to test the backends registry.
+        """
+        self.assertIs(get_profiler("statistical"), StatisticalProfiler)
+        self.assertIs(get_profiler(DeterministicProfiler),
+                      DeterministicProfiler)
+        self.assertRaises(ValueError, get_profiler, "unknown")
+
+    def test_deterministic(self):
+        """ Method to test the deterministic backend.
+        """
+        profiler = DeterministicProfiler()
+        self.assertEqual(profiler.runcall(busy, 0.01), 0.01)
+        hits, duration = profiler.hit_stats(
+            busy.__code__.co_filename)(self.loop_lineno)
+        self.assertTrue(hits > 1)
+        self.assertTrue(duration > 0)
+
+    def test_targeted(self):
+        """ Method to test the targeted backend.
+        """
+        helper_lineno = inspect.getsourcelines(helper)[1] + 3
+        caller_lineno = inspect.getsourcelines(caller)[1] + 3
+        profiler = TargetedProfiler()
+        self.assertEqual(profiler.runcall(caller, 1), 2)
+        hit_stats = profiler.hit_stats(busy.__code__.co_filename)
+        self.assertEqual(hit_stats(caller_lineno)[0], 1)
+        self.assertEqual(hit_stats(caller.__code__.co_firstlineno), (0, 0))
+        self.assertEqual(hit_stats(helper_lineno), (0, 0))
+        self.assertTrue(profiler.total_time > 0)
+        profiler = TargetedProfiler(
+            codes=frozenset([caller.__code__, helper.__code__]))
+        profiler.runcall(caller, 1)
+        self.assertRaises(ValueError, profiler.runcall, caller, -5)
+        hit_stats = profiler.hit_stats(busy.__code__.co_filename)
+        self.assertEqual(hit_stats(caller_lineno)[0], 2)
+        self.assertEqual(hit_stats(helper_lineno)[0], 2)
+
+    def test_statistical(self):
+        """ Method to test the statistical backend.
+        """
+        profiler = StatisticalProfiler(period=0.001)
+        self.assertEqual(profiler.runcall(busy, 0.1), 0.1)
+        self.assertTrue(profiler.samples > 0)
+        self.assertTrue(profiler.total_time >= 0.1)
+        hits, duration = profiler.hit_stats(
+            busy.__code__.co_filename)(self.loop_lineno)
+        self.assertTrue(hits > 0)
+        self.assertTrue(0 < duration <= profiler.total_time)
+        out = StringIO()
+        annotate(profiler, out, SourceRange(busy))
+        self.assertIn("Times estimated from", out.getvalue())
+        self.assertIn("def busy(duration):", out.getvalue())
+
+    def test_recursion(self):
+        """ Method to test that only the outermost recursive call is
+        profiled.
+        """
+        sink = ListSink()
+        previous_sink = set_sink(sink)
+        try:
+            self.assertEqual(decorated_countdown(5), 0)
+        finally:
+            set_sink(previous_sink)
+        self.assertEqual(CountingProfiler.instances, 1)
+        profiles = [record.profile for record in sink.records
+                    if getattr(record, "profile", None) is not None]
+        self.assertEqual(len(profiles), 1)
+        profiler, source = profiles[0]
+        hits = [hits for hits, _ in source.timings(profiler)]
+        self.assertEqual(hits[3], 6)
+
+    def test_nested(self):
+        """ Method to test that the nested calls to another decorated function
+        are profiled, unless their lines are traced by the profiled call in
+        progress.
+        """
+        for trace_registered, nb_profiles in ((False, 2), (True, 1)):
+            decorated_func = bredala_signature(
+                nested_caller, trace_registered=trace_registered)
+            sink = ListSink()
+            previous_sink = set_sink(sink)
+            try:
+                self.assertEqual(decorated_func(1), 2)
+            finally:
+                set_sink(previous_sink)
+            profiles = [record.profile for record in sink.records
+                        if getattr(record, "profile", None) is not None]
+            self.assertEqual(len(profiles), nb_profiles)
+
+    def test_recursion_durations(self):
+        """ Method to test that the time spent in the traced recursive calls
+        is accounted once.
+        """
+        profiler = TargetedProfiler()
+        self.assertEqual(profiler.runcall(busy_sum, 10), 55)
+        hit_stats = profiler.hit_stats(busy_sum.__code__.co_filename)
+        first_lineno = busy_sum.__code__.co_firstlineno
+        nb_lines = len(inspect.getsourcelines(busy_sum)[0])
+        durations = [hit_stats(lineno)[1] for lineno in range(
+            first_lineno, first_lineno + nb_lines)]
+        self.assertTrue(sum(durations) >= 0.022)
+        self.assertTrue(sum(durations) <= profiler.total_time)
+
+
+def test():
+    """ Function to execute unitests.
+    """
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestProfilers)
+    runtime = unittest.TextTestRunner(verbosity=2).run(suite)
+    return runtime.wasSuccessful()
+
+
+if __name__ == "__main__":
+    test()
@@ -0,0 +1,85 @@
+##########################################################################
+# Bredala - Copyright (C) AGrigis, 2015
+# Distributed under the terms of the CeCILL-B license, as published by
+# the CEA-CNRS-INRIA. Refer to the LICENSE file or to
+# http://www.cecill.info/licences/Licence_CeCILL-B_V1-en.html
+# for details.
+##########################################################################
+
+# System import
+import unittest
+from io import StringIO
+
+# Bredala import
+import bredala
+from bredala.sampling import Sampler
+from bredala.signaturedecorator import bredala_signature
+from bredala.stats import collect
+from bredala.stats import reset
+from bredala.test.support import addition
+
+
+class TestSampling(unittest.TestCase):
+    """ Test the profiled calls sampling.
+    """
+    def setUp(self):
+        """ Clear the recorded statistics.
+        """
+        reset()
+
+    def tearDown(self):
+        """ Clear the recorded statistics.
+        """
+        reset()
+
+    def test_sampler(self):
+        """ Method to test the 1-in-N and per second budget sampling.
+        """
+        sampler = Sampler(sample_rate=3)
+        self.assertEqual([sampler.sample() for _ in range(7)],
+                         [True, False, False, True, False, False, True])
+        sampler = Sampler(sample_budget=2)
+        self.assertEqual(sum([sampler.sample() for _ in range(10)]), 2)
+        self.assertRaises(ValueError, Sampler, sample_rate=0)
+        self.assertRaises(ValueError, Sampler, sample_budget=0)
+
+    def test_merged_profiles(self):
+        """ Method to test that the line profiles of the sampled calls are
+        merged.
+        """
+        decorated_func = bredala_signature(addition, aggregate=True,
+                                           sample_rate=4)
+        for _ in range(10):
+            self.assertEqual(decorated_func(2, 1), 3)
+        name = addition.__module__ + ".addition"
+        collect()
+        self.assertEqual(bredala._stats[name].count, 10)
+        profile = bredala._profiles[name]
+        self.assertEqual(profile.samples, 3)
+        self.assertEqual(profile.hits[-1], 3)
+        self.assertEqual(profile.source_lines[-1].strip(), "return a + b")
+        out = StringIO()
+        bredala.report(out=out)
+        self.assertIn("Line profile of {0} (3 profiled calls)".format(name),
+                      out.getvalue())
+
+    def test_aggregate_without_sampling(self):
+        """ Method to test that the aggregation mode does not profile calls
+        without sampling options.
+        """
+        decorated_func = bredala_signature(addition, aggregate=True)
+        decorated_func(2, 1)
+        collect()
+        self.assertEqual(len(bredala._profiles), 0)
+
+
+def test():
+    """ Function to execute unitests.
+    """
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestSampling)
+    runtime = unittest.TextTestRunner(verbosity=2).run(suite)
+    return runtime.wasSuccessful()
+
+
+if __name__ == "__main__":
+    test()
@@ -0,0 +1,201 @@
+##########################################################################
+# Bredala - Copyright (C) AGrigis, 2017
+# Distributed under the terms of the CeCILL-B license, as published by
+# the CEA-CNRS-INRIA. Refer to the LICENSE file or to
+# http://www.cecill.info/licences/Licence_CeCILL-B_V1-en.html
+# for details.
+##########################################################################
+
+# System import
+import unittest
+import inspect
+import pickle
+import numpy
+from concurrent.futures import ProcessPoolExecutor
+
+# Package import
+from bredala.demo.myfunctions import mytype
+from bredala.exceptions import ArgumentValidationError
+from bredala.signaturedecorator import BindingPlan
+from bredala.signaturedecorator import bredala_signature
+from bredala.signaturedecorator import SourceRange
+from bredala.signaturedecorator import BoundedRepr
+from bredala.typedecorator import inputs
+
+
+class Square(object):
+    """ Class used for tests.
+    """
+    def __init__(self, name):
+        self.name = name
+
+    def area(self, length_of_side):
+        return length_of_side ** 2
+
+
+def multiply(a, b):
+    """ Function used for tests.
+    """
+    return a * b
+
+
+class Cube(object):
+    """ Class used for tests.
+    """
+    def volume(self, length_of_side):
+        return length_of_side ** 3
+
+
+multiply = bredala_signature(multiply, verbosity="off")
+Cube.volume = bredala_signature(Cube.volume, is_method=True,
+                                verbosity="off")
+
+
+class TestBindingPlan(unittest.TestCase):
+    """ Test the call-binding plan computed at decoration time.
+    """
+    def test_function_signature(self):
+        """ Method to test the signature of a function call.
+        """
+        plan = BindingPlan(mytype)
+        self.assertEqual(plan.obj_name, "bredala.demo.myfunctions.mytype")
+        self.assertEqual(plan.package_name, "bredala")
+        signature, self_parameter = plan.signature((1, ), {})
+        self.assertEqual(signature, "mytype(param=1, optional=None)")
+        self.assertIsNone(self_parameter)
+        signature, _ = plan.signature((1, ), {"optional": "a"})
+        self.assertEqual(signature, "mytype(param=1, optional='a')")
+        signature, _ = plan.signature((1, 2), {})
+        self.assertEqual(signature, "mytype(param=1, optional=2)")
+        self.assertRaises(KeyError, plan.signature, (), {})
+
+    def test_method_signature(self):
+        """ Method to test the signature of a class method call.
+        """
+        plan = BindingPlan(Square.area, is_method=True)
+        obj = Square("my_square")
+        signature, self_parameter = plan.signature((obj, 2), {})
+        self.assertIs(self_parameter, obj)
+        self.assertTrue(signature.endswith(", length_of_side=2)"))
+        self.assertEqual(plan.qualified_name(self_parameter),
+                         Square.__module__ + ".Square.area")
+
+
+def first(value):
+    """ Function whose last line is shared with 'second'.
+    """
+    return value
+
+
+def second(value):
+    """ Function whose last line is shared with 'first'.
+    """
+    def inner():
+        return value
+    return value
+
+
+class TestSourceRange(unittest.TestCase):
+    """ Test the source line range computed from the code objects.
+    """
+    def test_source_range(self):
+        """ Method to test the line range of functions that share lines.
+        """
+        for func in (first, second):
+            source_lines, first_lineno = inspect.getsourcelines(func)
+            source = SourceRange(func)
+            self.assertEqual(source.first_lineno, first_lineno)
+            self.assertEqual(source.last_lineno,
+                             first_lineno + len(source_lines) - 1)
+            self.assertEqual(source.lines, source_lines)
+
+
+class TestBoundedRepr(unittest.TestCase):
+    """ Test the bounded representation engine.
+    """
+    def test_containers(self):
+        """ Method to test the item and depth budgets.
+        """
+        engine = BoundedRepr(max_depth=2, max_items=4)
+        self.assertEqual(engine.repr(list(range(100))),
+                         "[0, 1, ..., 98, 99]")
+        self.assertEqual(engine.repr((1, [2, [3]])), "(1, [2, [...]])")
+        self.assertEqual(engine.repr({"a": 1, "b": {"c": [1]}}),
+                         "{'a': 1, 'b': {'c': [...]}}")
+        self.assertEqual(engine.repr(dict.fromkeys(range(10), 0)),
+                         "{0: 0, 1: 0, 2: 0, 3: 0, ...}")
+        self.assertEqual(engine.repr(set()), "set()")
+        self.assertEqual(engine.repr(frozenset([1])), "frozenset({1})")
+
+    def test_characters(self):
+        """ Method to test the character budget.
+        """
+        engine = BoundedRepr(max_chars=30)
+        obj_repr = engine.repr(["a" * 10] * 10)
+        self.assertTrue(len(obj_repr) <= 30)
+        self.assertTrue(obj_repr.endswith("..."))
+        self.assertTrue(len(engine.repr("b" * 10000)) <= 30)
+        self.assertTrue(len(engine.repr(b"b" * 10000)) <= 30)
+        self.assertTrue(len(engine.repr(bytearray(10000))) <= 30)
+        for obj in (list(range(1000)), dict.fromkeys(range(1000), 0)):
+            engine = BoundedRepr(max_chars=1000, max_items=1000)
+            obj_repr = engine.object_repr(obj, 0)
+            self.assertTrue(len(obj_repr) <= 1010)
+            self.assertTrue(obj_repr[:-1].endswith("..."))
+
+    def test_arrays(self):
+        """ Method to test the numpy arrays summaries.
+        """
+        engine = BoundedRepr(array_stats=True)
+        self.assertEqual(engine.repr(numpy.arange(3)), "array([0, 1, 2])")
+        self.assertEqual(
+            engine.repr(numpy.ones((100, 200), dtype=numpy.float32)),
+            "array(shape=(100, 200), dtype=float32, nbytes=80000, "
+            "sample_min=1.0, sample_max=1.0)")
+
+
+class TestSignature(unittest.TestCase):
+    """ Test the signature decorator.
+    """
+    def test_type_decorators(self):
+        """ Method to test that the type checks are applied in both the
+        profiled and unprofiled paths.
+        """
+        for use_profiler in (False, True):
+            decorated_func = bredala_signature(
+                mytype, use_profiler=use_profiler,
+                type_decorators=[(inputs, (float, ))])
+            self.assertEqual(decorated_func(1.), repr(float))
+            self.assertRaises(ArgumentValidationError, decorated_func, 1)
+
+    def test_wrapper(self):
+        """ Method to test the wrapper metadata, binding and pickling.
+        """
+        self.assertEqual(multiply.__name__, "multiply")
+        self.assertEqual(multiply.__doc__.strip(), "Function used for tests.")
+        self.assertEqual(multiply.__wrapped__(2, 3), 6)
+        self.assertEqual(Cube().volume(2), 8)
+        self.assertEqual(Cube.volume.__qualname__, "Cube.volume")
+        self.assertIs(pickle.loads(pickle.dumps(multiply)), multiply)
+        self.assertIs(pickle.loads(pickle.dumps(Cube.volume)), Cube.volume)
+        self.assertRaises((pickle.PicklingError, AttributeError),
+                          pickle.dumps, bredala_signature(lambda: None))
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            self.assertEqual(executor.submit(multiply, 2, 3).result(), 6)
+
+
+def test():
+    """ Function to execute unitests.
+    """
+    loader = unittest.TestLoader()
+    suite = unittest.TestSuite([
+        loader.loadTestsFromTestCase(TestBindingPlan),
+        loader.loadTestsFromTestCase(TestSourceRange),
+        loader.loadTestsFromTestCase(TestBoundedRepr),
+        loader.loadTestsFromTestCase(TestSignature)])
+    runtime = unittest.TextTestRunner(verbosity=2).run(suite)
+    return runtime.wasSuccessful()
+
+
+if __name__ == "__main__":
+    test()
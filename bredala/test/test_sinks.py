@@ -0,0 +1,170 @@
+##########################################################################
+# Bredala - Copyright (C) AGrigis, 2015
+# Distributed under the terms of the CeCILL-B license, as published by
+# the CEA-CNRS-INRIA. Refer to the LICENSE file or to
+# http://www.cecill.info/licences/Licence_CeCILL-B_V1-en.html
+# for details.
+##########################################################################
+
+# System import
+import unittest
+import threading
+from contextlib import redirect_stderr
+from io import StringIO
+
+# Bredala import
+from bredala.signaturedecorator import bredala_signature
+from bredala.sinks import ThreadedSink
+from bredala.sinks import set_sink
+from bredala.test.support import ListSink
+from bredala.test.support import addition
+
+
+class TextRecord(object):
+    """ A record for tests.
+    """
+    def __init__(self, text):
+        self.text = text
+
+    def format(self):
+        return self.text
+
+
+class BlockingStream(StringIO):
+    """ A stream that blocks until it is released.
+    """
+    def __init__(self):
+        StringIO.__init__(self)
+        self.released = threading.Event()
+
+    def write(self, text):
+        self.released.wait()
+        return StringIO.write(self, text)
+
+
+class FailingSink(object):
+    """ A sink that fails to emit the records.
+    """
+    def emit(self, record):
+        raise IOError("No space left on device.")
+
+    def close(self):
+        pass
+
+
+class TestSinks(unittest.TestCase):
+    """ Test the output sinks.
+    """
+    def test_threaded_sink(self):
+        """ Method to test that the records are written in order by the
+        background thread.
+        """
+        out = StringIO()
+        sink = ThreadedSink(stream=out, batch_size=3)
+        for index in range(10):
+            sink.emit(TextRecord("{0}\n".format(index)))
+        sink.flush()
+        self.assertEqual(out.getvalue(), "".join(
+            ["{0}\n".format(index) for index in range(10)]))
+        sink.emit(TextRecord("last\n"))
+        sink.close()
+        self.assertTrue(out.getvalue().endswith("last\n"))
+
+    def test_overflow(self):
+        """ Method to test the 'drop' and 'count' overflow policies.
+        """
+        self.assertRaises(ValueError, ThreadedSink, overflow="unknown")
+        for overflow in ("drop", "count"):
+            out = BlockingStream()
+            sink = ThreadedSink(stream=out, maxsize=1, overflow=overflow)
+            for index in range(10):
+                sink.emit(TextRecord("{0}\n".format(index)))
+            out.released.set()
+            sink.close()
+            self.assertTrue(sink.dropped > 0)
+            self.assertEqual(
+                "records dropped" in out.getvalue(), overflow == "count")
+
+    def test_decorator_records(self):
+        """ Method to test that the decorated calls are written in the
+        current sink.
+        """
+        out = StringIO()
+        previous_sink = set_sink(ThreadedSink(stream=out))
+        try:
+            decorated_func = bredala_signature(addition, use_profiler=False)
+            self.assertEqual(decorated_func(2, 1), 3)
+        finally:
+            set_sink(previous_sink)
+        self.assertIn("Calling {0}.addition".format(addition.__module__),
+                      out.getvalue())
+        self.assertIn("addition(a=2, b=1)", out.getvalue())
+
+    def test_sink_errors(self):
+        """ Method to test that the sink errors do not replace the returned
+        value or the exception of the decorated calls.
+        """
+        err = StringIO()
+        previous_sink = set_sink(FailingSink())
+        try:
+            decorated_func = bredala_signature(addition, use_profiler=False)
+            with redirect_stderr(err):
+                self.assertEqual(decorated_func(2, 1), 3)
+                self.assertRaises(TypeError, decorated_func, 2, "1")
+        finally:
+            set_sink(previous_sink)
+        self.assertIn("[bredala] Record emission failed: No space left",
+                      err.getvalue())
+
+    def test_verbosity(self):
+        """ Method to test the records emitted at each verbosity level.
+        """
+        self.assertRaises(ValueError, bredala_signature, addition,
+                          verbosity="unknown")
+        for verbosity, nb_records in (("off", 0), ("timing", 1),
+                                      ("signature", 2), ("profile", 2)):
+            sink = ListSink()
+            previous_sink = set_sink(sink)
+            try:
+                decorated_func = bredala_signature(
+                    addition, verbosity=verbosity)
+                self.assertEqual(decorated_func(2, 1), 3)
+            finally:
+                set_sink(previous_sink)
+            self.assertEqual(len(sink.records), nb_records)
+        text = "".join([record.format() for record in sink.records])
+        self.assertIn("addition(a=2, b=1)", text)
+        self.assertIn("return a + b", text)
+
+    def test_deferred_signature(self):
+        """ Method to test that the signature is formatted when the record
+        is written.
+        """
+        sink = ListSink()
+        previous_sink = set_sink(sink)
+        try:
+            decorated_func = bredala_signature(addition, verbosity="timing")
+            decorated_func([1], [2])
+            decorated_func = bredala_signature(
+                addition, verbosity="signature")
+            values = [1]
+            decorated_func(values, [2])
+        finally:
+            set_sink(previous_sink)
+        self.assertIn("{0}.addition".format(addition.__module__),
+                      sink.records[0].format())
+        self.assertEqual(sink.records[1].args, (values, [2]))
+        values.append(3)
+        self.assertIn("addition(a=[1, 3], b=[2])", sink.records[1].format())
+
+
+def test():
+    """ Function to execute unitests.
+    """
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestSinks)
+    runtime = unittest.TextTestRunner(verbosity=2).run(suite)
+    return runtime.wasSuccessful()
+
+
+if __name__ == "__main__":
+    test()
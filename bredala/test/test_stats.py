@@ -0,0 +1,243 @@
+##########################################################################
+# Bredala - Copyright (C) AGrigis, 2015
+# Distributed under the terms of the CeCILL-B license, as published by
+# the CEA-CNRS-INRIA. Refer to the LICENSE file or to
+# http://www.cecill.info/licences/Licence_CeCILL-B_V1-en.html
+# for details.
+##########################################################################
+
+# System import
+import gc
+import time
+import inspect
+import unittest
+import threading
+from contextlib import redirect_stdout
+from collections.abc import Generator
+from io import StringIO
+
+# Bredala import
+import bredala
+from bredala.signaturedecorator import bredala_signature
+from bredala.calibration import Calibration
+from bredala.stats import FunctionStats
+from bredala.stats import collect
+from bredala.stats import reset
+from bredala.stats import report_at_exit
+from bredala.test.support import addition
+
+
+def factorial(n):
+    """ Recursive function used for tests.
+    """
+    time.sleep(0.001)
+    if n <= 1:
+        return 1
+    return n * decorated_factorial(n - 1)
+
+
+decorated_factorial = bredala_signature(factorial, aggregate=True)
+
+
+def produce(nb_items, delay):
+    """ Generator function used for tests.
+    """
+    for index in range(nb_items):
+        time.sleep(delay)
+        yield index
+
+
+class Square(object):
+    """ Class used for tests.
+    """
+    def __init__(self, name):
+        self.name = name
+
+    def area(self, length_of_side):
+        return length_of_side ** 2
+
+
+class TestStats(unittest.TestCase):
+    """ Test the aggregated statistics mode.
+    """
+    def setUp(self):
+        """ Clear the recorded statistics.
+        """
+        reset()
+
+    def tearDown(self):
+        """ Clear the recorded statistics.
+        """
+        reset()
+
+    def test_function_stats(self):
+        """ Method to test the statistics accumulation.
+        """
+        stats = FunctionStats("f")
+        for duration in (2e-6, 5e-3, 20.):
+            stats.record(duration)
+        self.assertEqual(stats.count, 3)
+        self.assertEqual(stats.min, 2e-6)
+        self.assertEqual(stats.max, 20.)
+        self.assertEqual(stats.histogram, [0, 1, 0, 0, 1, 0, 0, 0, 1])
+        other = FunctionStats("f")
+        other.record(1e-7)
+        stats.merge(other)
+        self.assertEqual(stats.count, 4)
+        self.assertEqual(stats.min, 1e-7)
+        self.assertEqual(stats.histogram[0], 1)
+
+    def test_aggregate(self):
+        """ Method to test that decorated calls are aggregated.
+        """
+        decorated_func = bredala_signature(addition, aggregate=True)
+        for _ in range(5):
+            self.assertEqual(decorated_func(2, 1), 3)
+        decorated_method = bredala_signature(Square.area, is_method=True,
+                                             aggregate=True)
+        self.assertEqual(decorated_method(Square("my_square"), 2), 4)
+        collect()
+        self.assertEqual(
+            bredala._stats[addition.__module__ + ".addition"].count, 5)
+        self.assertEqual(
+            bredala._stats[Square.__module__ + ".Square.area"].count, 1)
+        out = StringIO()
+        bredala.report(out=out)
+        lines = out.getvalue().split("\n")
+        self.assertTrue(any(line.startswith("         5|") and
+                            line.endswith(".addition")
+                            for line in lines))
+        self.assertRaises(ValueError, bredala.report, sort="unknown")
+
+    def test_report_at_exit(self):
+        """ Method to test that the exit report is skipped when nothing has
+        been recorded since the last report.
+        """
+        decorated_func = bredala_signature(addition, aggregate=True)
+        decorated_func(2, 1)
+        bredala.report(out=StringIO())
+        out = StringIO()
+        with redirect_stdout(out):
+            report_at_exit()
+        self.assertEqual(out.getvalue(), "")
+        decorated_func(2, 1)
+        with redirect_stdout(out):
+            report_at_exit()
+        self.assertIn("[bredala] Statistics summary", out.getvalue())
+
+    def test_call_graph(self):
+        """ Method to test the inclusive/exclusive times and the call graph
+        edges of nested calls.
+        """
+        self.assertEqual(decorated_factorial(3), 6)
+        name = factorial.__module__ + ".factorial"
+        collect()
+        stats = bredala._stats[name]
+        self.assertEqual(stats.count, 3)
+        self.assertTrue(stats.exclusive < stats.total)
+        self.assertTrue(stats.exclusive >= 0.003)
+        edge = bredala._edges[(name, name)]
+        self.assertEqual(edge.count, 2)
+        self.assertTrue(edge.exclusive < edge.inclusive)
+        out = StringIO()
+        bredala.report(out=out)
+        self.assertIn("[bredala] Call graph", out.getvalue())
+        self.assertIn("{0} -> {0}".format(name), out.getvalue())
+
+    def test_threads(self):
+        """ Method to test that the calls recorded by concurrent threads are
+        merged.
+        """
+        decorated_func = bredala_signature(addition, aggregate=True)
+
+        def worker():
+            for _ in range(1000):
+                decorated_func(2, 1)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        collect()
+        self.assertEqual(
+            bredala._stats[addition.__module__ + ".addition"].count, 4000)
+
+    def test_finished_threads(self):
+        """ Method to test that the buffers of the finished threads are
+        released and their statistics kept.
+        """
+        decorated_func = bredala_signature(addition, aggregate=True)
+        nb_buffers = len(bredala._buffers)
+        for _ in range(3):
+            thread = threading.Thread(target=decorated_func, args=(2, 1))
+            thread.start()
+            thread.join()
+        gc.collect()
+        self.assertEqual(len(bredala._buffers), nb_buffers)
+        collect()
+        self.assertEqual(
+            bredala._stats[addition.__module__ + ".addition"].count, 3)
+
+    def test_generator(self):
+        """ Method to test that the generators are timed until their
+        exhaustion or close.
+        """
+        decorated_func = bredala_signature(produce, aggregate=True)
+        self.assertTrue(inspect.isgeneratorfunction(decorated_func))
+        generator = decorated_func(3, 0.002)
+        self.assertIsInstance(generator, Generator)
+        self.assertEqual(list(generator), [0, 1, 2])
+        generator = decorated_func(10, 0.)
+        self.assertEqual(next(generator), 0)
+        generator.close()
+        for item in decorated_func(10, 0.):
+            if item == 3:
+                break
+        gc.collect()
+        collect()
+        stats = bredala._stats[produce.__module__ + ".produce"]
+        self.assertTrue(stats.generator)
+        self.assertEqual(stats.count, 3)
+        self.assertEqual(stats.items, 8)
+        self.assertTrue(stats.running >= 0.006)
+        out = StringIO()
+        bredala.report(out=out)
+        self.assertIn("[bredala] Generators", out.getvalue())
+
+    def test_calibration(self):
+        """ Method to test the timing overhead correction and the noise floor
+        flag.
+        """
+        calibration = bredala.calibrate(number=200)
+        self.assertIs(bredala._calibration, calibration)
+        self.assertTrue(calibration.overhead > 0)
+        self.assertTrue(calibration.noise_floor > 0)
+        self.assertEqual(calibration.correct(10, 5), 10)
+        decorated_func = bredala_signature(addition, aggregate=True)
+        bredala._calibration = Calibration(overhead=10 ** 9,
+                                           noise_floor=10 ** 9)
+        try:
+            decorated_func(2, 1)
+            collect()
+            self.assertEqual(
+                bredala._stats[addition.__module__ + ".addition"].total, 0.)
+            out = StringIO()
+            bredala.report(out=out)
+        finally:
+            bredala._calibration = calibration
+        self.assertIn("|~{0}.addition".format(addition.__module__),
+                      out.getvalue())
+        self.assertIn("within the noise floor", out.getvalue())
+
+
+def test():
+    """ Function to execute unitests.
+    """
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestStats)
+    runtime = unittest.TextTestRunner(verbosity=2).run(suite)
+    return runtime.wasSuccessful()
+
+
+if __name__ == "__main__":
+    test()
@@ -0,0 +1,222 @@
+##########################################################################
+# Bredala - Copyright (C) AGrigis, 2015
+# Distributed under the terms of the CeCILL-B license, as published by
+# the CEA-CNRS-INRIA. Refer to the LICENSE file or to
+# http://www.cecill.info/licences/Licence_CeCILL-B_V1-en.html
+# for details.
+##########################################################################
+
+# System import
+import os
+import json
+import asyncio
+import shutil
+import tempfile
+import unittest
+import threading
+
+# Bredala import
+from bredala.signaturedecorator import bredala_signature
+from bredala.sinks import TraceSink
+from bredala.sinks import ChromeTraceSink
+from bredala.sinks import set_sink
+from bredala.trace import iter_calls
+from bredala.trace import filter_calls
+from bredala.trace import top_calls
+from bredala.trace import aggregate_calls
+from bredala.test.support import ListSink
+from bredala.test.support import addition
+
+
+def nested_addition(a, b):
+    """ Function used for tests.
+    """
+    return decorated_addition(a, b)
+
+
+decorated_addition = bredala_signature(addition, verbosity="timing")
+
+
+async def wait(delay):
+    """ Coroutine function used for tests.
+    """
+    await asyncio.sleep(delay)
+    return delay
+
+
+def count(stop):
+    """ Generator function used for tests.
+    """
+    for item in range(stop):
+        yield item
+
+
+class TestTrace(unittest.TestCase):
+    """ Test the trace files.
+    """
+    def setUp(self):
+        """ Create a temporary directory.
+        """
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, "trace.jsonl")
+
+    def tearDown(self):
+        """ Remove the temporary directory.
+        """
+        shutil.rmtree(self.tmpdir)
+
+    def test_trace_sink(self):
+        """ Method to test the written calls and the reader tools.
+        """
+        previous_sink = set_sink(TraceSink(self.filename, signatures=True))
+        try:
+            decorated_func = bredala_signature(addition)
+            for index in range(5):
+                decorated_func(index, 1)
+            self.assertRaises(TypeError, decorated_func, "a", 1)
+        finally:
+            set_sink(previous_sink)
+        calls = list(iter_calls([self.filename]))
+        self.assertEqual(len(calls), 6)
+        name = "{0}.addition".format(addition.__module__)
+        self.assertEqual(set([call.name for call in calls]), set([name]))
+        self.assertEqual(calls[0].signature, "addition(a=0, b=1)")
+        self.assertTrue(all([call.end >= call.start for call in calls]))
+        failed = list(filter_calls(calls, status="TypeError"))
+        self.assertEqual(len(failed), 1)
+        self.assertEqual(list(filter_calls(calls, function="*.other")), [])
+        self.assertEqual(len(top_calls(calls, 3)), 3)
+        self.assertEqual(aggregate_calls(calls)[name].count, 6)
+
+    def test_rotation(self):
+        """ Method to test the trace files rotation.
+        """
+        previous_sink = set_sink(TraceSink(
+            self.filename, max_bytes=200, backup_count=2))
+        try:
+            decorated_func = bredala_signature(addition, verbosity="timing")
+            for index in range(50):
+                decorated_func(index, 1)
+        finally:
+            set_sink(previous_sink)
+        filenames = [self.filename + ".2", self.filename + ".1",
+                     self.filename]
+        self.assertTrue(all([os.path.isfile(path) for path in filenames]))
+        self.assertFalse(os.path.isfile(self.filename + ".3"))
+        self.assertTrue(os.path.getsize(self.filename + ".1") < 400)
+        calls = list(iter_calls(filenames))
+        self.assertTrue(0 < len(calls) < 50)
+
+    def test_chrome_trace_sink(self):
+        """ Method to test the Chrome Trace Event export of nested calls.
+        """
+        previous_sink = set_sink(ChromeTraceSink(self.filename))
+        try:
+            decorated_func = bredala_signature(
+                nested_addition, verbosity="timing")
+            decorated_func(1, 2)
+        finally:
+            set_sink(previous_sink)
+        with open(self.filename) as open_file:
+            events = json.load(open_file)
+        self.assertEqual([event["ph"] for event in events], ["M", "X", "X"])
+        inner, outer = events[1:]
+        self.assertTrue(inner["name"].endswith(".addition"))
+        self.assertTrue(outer["name"].endswith(".nested_addition"))
+        self.assertEqual(inner["tid"], outer["tid"])
+        self.assertTrue(outer["ts"] <= inner["ts"])
+        self.assertTrue(inner["ts"] + inner["dur"] <=
+                        outer["ts"] + outer["dur"])
+
+    def test_chrome_trace_sink_thread_names(self):
+        """ Method to test that the thread name is written by the first
+        record emitted by its own thread.
+        """
+        sink = ListSink()
+        previous_sink = set_sink(sink)
+        try:
+            decorated_addition(1, 2)
+        finally:
+            set_sink(previous_sink)
+        record = sink.records[-1]
+        chrome_sink = ChromeTraceSink(self.filename)
+        started, emitted = threading.Event(), threading.Event()
+
+        def worker():
+            record.thread = threading.get_ident()
+            started.set()
+            emitted.wait()
+            chrome_sink.emit(record)
+
+        thread = threading.Thread(target=worker, name="worker")
+        thread.start()
+        started.wait()
+        chrome_sink.emit(record)
+        emitted.set()
+        thread.join()
+        chrome_sink.close()
+        with open(self.filename) as open_file:
+            events = json.load(open_file)
+        self.assertEqual([event["ph"] for event in events], ["X", "M", "X"])
+        self.assertEqual(events[1]["args"]["name"], "worker")
+
+    def test_chrome_trace_sink_coroutines(self):
+        """ Method to test the Chrome Trace Event export of concurrent
+        coroutine calls.
+        """
+        decorated_func = bredala_signature(wait, verbosity="timing")
+
+        async def main():
+            return await asyncio.gather(decorated_func(0.02),
+                                        decorated_func(0.01))
+
+        previous_sink = set_sink(ChromeTraceSink(self.filename))
+        try:
+            self.assertEqual(asyncio.run(main()), [0.02, 0.01])
+        finally:
+            set_sink(previous_sink)
+        with open(self.filename) as open_file:
+            events = json.load(open_file)
+        events = [event for event in events if event["ph"] != "M"]
+        self.assertEqual(sorted(event["ph"] for event in events),
+                         ["b", "b", "e", "e"])
+        begins = dict((event["id"], event) for event in events
+                      if event["ph"] == "b")
+        self.assertEqual(len(begins), 2)
+        for event in events:
+            if event["ph"] == "e":
+                self.assertTrue(event["ts"] >= begins[event["id"]]["ts"])
+                self.assertEqual(event["name"], begins[event["id"]]["name"])
+
+    def test_chrome_trace_sink_generators(self):
+        """ Method to test the Chrome Trace Event export of interleaved
+        generator calls.
+        """
+        decorated_func = bredala_signature(count, verbosity="timing")
+        previous_sink = set_sink(ChromeTraceSink(self.filename))
+        try:
+            self.assertEqual(
+                list(zip(decorated_func(2), decorated_func(3))),
+                [(0, 0), (1, 1)])
+        finally:
+            set_sink(previous_sink)
+        with open(self.filename) as open_file:
+            events = json.load(open_file)
+        events = [event for event in events if event["ph"] != "M"]
+        self.assertEqual(sorted(event["ph"] for event in events),
+                         ["b", "b", "e", "e"])
+        items = sorted(event["args"]["items"] for event in events
+                       if event["ph"] == "b")
+        self.assertEqual(items, [2, 2])
+
+
+def test():
+    """ Function to execute unitests.
+    """
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestTrace)
+    runtime = unittest.TextTestRunner(verbosity=2).run(suite)
+    return runtime.wasSuccessful()
+
+
+if __name__ == "__main__":
+    test()
@@ -0,0 +1,212 @@
+##########################################################################
+# Bredala - Copyright (C) AGrigis, 2015
+# Distributed under the terms of the CeCILL-B license, as published by
+# the CEA-CNRS-INRIA. Refer to the LICENSE file or to
+# http://www.cecill.info/licences/Licence_CeCILL-B_V1-en.html
+# for details.
+##########################################################################
+
+"""
+Module that reads the trace files written by the TraceSink.
+
+The trace files are streamed line by line so that large traces can be
+filtered and aggregated with a bounded memory::
+
+    python -m bredala.trace trace.jsonl.1 trace.jsonl --top 20
+    python -m bredala.trace trace.jsonl --function "*.myfunctions.*"
+"""
+
+
+# System import
+import io
+import sys
+import json
+import heapq
+import fnmatch
+import argparse
+import collections
+
+# Bredala import
+from bredala.stats import FunctionStats
+
+
+class TraceCall(collections.namedtuple(
+        "TraceCall",
+        ["name", "thread", "start", "end", "status", "signature"])):
+    """ A call read from a trace file.
+    """
+    __slots__ = ()
+
+    @property
+    def duration(self):
+        """ The call execution time in seconds.
+        """
+        return (self.end - self.start) * 1e-9
+
+
+def iter_calls(filenames):
+    """ Stream the calls of trace files.
+
+    Parameters
+    ----------
+    filenames: list of str (mandatory)
+        the trace files, rotated files must be given from the oldest to the
+        newest.
+
+    Returns
+    -------
+    calls: iterator of TraceCall
+        the recorded calls.
+    """
+    for filename in filenames:
+        functions = {}
+        with io.open(filename, "rb") as open_file:
+            for line in open_file:
+                item = json.loads(line.decode("utf-8"))
+                if isinstance(item, list):
+                    signature = item[5] if len(item) > 5 else None
+                    yield TraceCall(functions[item[0]], item[1], item[2],
+                                    item[3], item[4], signature)
+                elif "id" in item:
+                    functions[item["id"]] = item["name"]
+                elif item.get("bredala") != "trace":
+                    raise ValueError("'{0}' is not a bredala trace.".format(
+                        filename))
+
+
+def filter_calls(calls, function=None, thread=None, status=None,
+                 min_duration=None):
+    """ Filter a stream of calls.
+
+    Parameters
+    ----------
+    calls: iterator of TraceCall (mandatory)
+        the calls to be filtered.
+    function: str (optional, default None)
+        a shell-style pattern matched against the function qualified names.
+    thread: int (optional, default None)
+        keep only the calls of this thread.
+    status: str (optional, default None)
+        keep only the calls with this status, eg. 'ok'.
+    min_duration: float (optional, default None)
+        keep only the calls longer than this time in seconds.
+
+    Returns
+    -------
+    calls: iterator of TraceCall
+        the selected calls.
+    """
+    for call in calls:
+        if function is not None and not fnmatch.fnmatchcase(
+                call.name, function):
+            continue
+        if thread is not None and call.thread != thread:
+            continue
+        if status is not None and call.status != status:
+            continue
+        if min_duration is not None and call.duration < min_duration:
+            continue
+        yield call
+
+
+def top_calls(calls, number=10):
+    """ Select the slowest calls.
+
+    Parameters
+    ----------
+    calls: iterator of TraceCall (mandatory)
+        the calls to be sorted.
+    number: int (optional, default 10)
+        the number of selected calls.
+
+    Returns
+    -------
+    calls: list of TraceCall
+        the slowest calls in decreasing duration order.
+    """
+    return heapq.nlargest(number, calls, key=lambda call: call.end -
+                          call.start)
+
+
+def aggregate_calls(calls):
+    """ Aggregate the execution times of a stream of calls.
+
+    Parameters
+    ----------
+    calls: iterator of TraceCall (mandatory)
+        the calls to be aggregated.
+
+    Returns
+    -------
+    stats: dict
+        the FunctionStats of each function qualified name.
+    """
+    stats = {}
+    for call in calls:
+        function_stats = stats.get(call.name)
+        if function_stats is None:
+            function_stats = stats[call.name] = FunctionStats(call.name)
+        function_stats.record(call.duration)
+    return stats
+
+
+def main(argv=None):
+    """ Filter and summarize trace files.
+
+    Parameters
+    ----------
+    argv: list of str (optional, default None)
+        the command line arguments, default to sys.argv[1:].
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m bredala.trace",
+        description="Filter and summarize bredala trace files.")
+    parser.add_argument(
+        "filenames", nargs="+", metavar="FILE",
+        help="the trace files, rotated files from the oldest to the newest.")
+    parser.add_argument(
+        "--function", help="a shell-style function qualified name pattern.")
+    parser.add_argument("--thread", type=int, help="a thread identifier.")
+    parser.add_argument("--status", help="a call status, eg. 'ok'.")
+    parser.add_argument("--min-duration", type=float,
+                        help="the minimum call duration in seconds.")
+    parser.add_argument("--top", type=int, default=0,
+                        help="display the N slowest calls instead of the "
+                             "per-function summary.")
+    parser.add_argument("--sort", default="total",
+                        choices=("total", "count", "mean", "min", "max"),
+                        help="the summary sort key.")
+    args = parser.parse_args(argv)
+
+    calls = filter_calls(
+        iter_calls(args.filenames), function=args.function,
+        thread=args.thread, status=args.status,
+        min_duration=args.min_duration)
+    out = sys.stdout
+    if args.top > 0:
+        print("{0:>13}|{1:>16}|{2:>10}|Function".format(
+            "Duration", "Thread", "Status"), file=out)
+        print("{0}+{1}+{2}+{3}".format(13 * "-", 16 * "-", 10 * "-",
+                                       8 * "-"), file=out)
+        for call in top_calls(calls, args.top):
+            print("{0:>13.6g}|{1:>16}|{2:>10}|{3}{4}".format(
+                call.duration, call.thread, call.status, call.name,
+                "" if call.signature is None else " " + call.signature),
+                file=out)
+        return
+    stats = sorted(aggregate_calls(calls).values(),
+                   key=lambda item: getattr(item, args.sort), reverse=True)
+    print("{0:>10}|{1:>13}|{2:>13}|{3:>13}|{4:>13}|Function".format(
+        "Calls", "Total", "Mean", "Min", "Max"), file=out)
+    print("{0}+{1}+{1}+{1}+{1}+{2}".format(10 * "-", 13 * "-", 8 * "-"),
+          file=out)
+    for function_stats in stats:
+        print("{0:>10}|{1:>13.6g}|{2:>13.6g}|{3:>13.6g}|{4:>13.6g}|"
+              "{5}".format(function_stats.count, function_stats.total,
+                           function_stats.mean, function_stats.min,
+                           function_stats.max, function_stats.name),
+              file=out)
+
+
+if __name__ == "__main__":
+    main()
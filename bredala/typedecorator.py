@@ -14,7 +14,7 @@ types.
 
 
 # System import
-import sys
+import builtins
 import re
 import inspect
 import logging
@@ -22,6 +22,7 @@ import importlib
 import functools
 
 # Package import
+from .exceptions import InvalidType
 from .exceptions import ArgumentValidationError
 from .exceptions import InvalidArgumentNumberError
 from .exceptions import InvalidReturnType
@@ -29,13 +30,8 @@ from .exceptions import InvalidReturnNumberError
 
 
 # Global parameters
-if sys.version_info[:2] >= (3, 0):
-    import builtins
-    TYPES = [t for t in builtins.__dict__.values() if isinstance(t, type)]
-else:
-    import __builtin__
-    TYPES = [t for t in __builtin__.__dict__.itervalues()
-             if isinstance(t, type)]
+TYPES = [t for t in builtins.__dict__.values() if isinstance(t, type)]
+_TYPES = frozenset(TYPES)
 
 
 def ordinal(num):
@@ -59,6 +55,168 @@ def ordinal(num):
         return "{0}{1}".format(num, ord)
 
 
+def check_types(accepted_types, special_types=()):
+    """ Check that registered types are valid.
+
+    This check is done once, when the decorator is created, so that the
+    generated validators only have to test the actual types.
+
+    Parameters
+    ----------
+    accepted_types: tuple (mandatory)
+        the registered types.
+    special_types: tuple of str (optional, default ())
+        special type names that are also accepted, eg. 'self' or 'cls'.
+    """
+    for accepted_type in accepted_types:
+        if accepted_type in special_types:
+            continue
+        if not isinstance(accepted_type, type) or accepted_type not in _TYPES:
+            raise InvalidType(accepted_type)
+
+
+def compile_validator(validate_function, name, source, namespace):
+    """ Compile a specialized validator from its generated source code.
+
+    Parameters
+    ----------
+    validate_function: callable (mandatory)
+        the function to be validated.
+    name: str (mandatory)
+        the name of the generated function.
+    source: list of str (mandatory)
+        the generated source code lines.
+    namespace: dict (mandatory)
+        the names accessible from the generated source code.
+
+    Returns
+    -------
+    validator: callable
+        the generated validator that wraps the input function.
+    """
+    namespace.update({
+        "validate_function": validate_function,
+        "func_name": validate_function.__name__,
+        "ArgumentValidationError": ArgumentValidationError,
+        "InvalidArgumentNumberError": InvalidArgumentNumberError,
+        "InvalidReturnType": InvalidReturnType,
+        "InvalidReturnNumberError": InvalidReturnNumberError})
+    code = compile("\n".join(source) + "\n", "<bredala {0} {1}>".format(
+        name, validate_function.__name__), "exec")
+    exec(code, namespace)
+    return functools.wraps(validate_function)(namespace[name])
+
+
+def inputs_validator(validate_function, accepted_arg_types):
+    """ Generate a function that validates the parameter types of a given
+    function.
+
+    The arity check, the skipped 'self'/'cls' slots and the exact type tests
+    are unrolled in a single specialized function. A fast path is generated
+    for calls without keyword arguments.
+
+    Parameters
+    ----------
+    validate_function: callable (mandatory)
+        the function to be validated.
+    accepted_arg_types: tuple (mandatory)
+        the expected parameter types.
+
+    Returns
+    -------
+    validator: callable
+        the generated validator that wraps the input function.
+    """
+    nb_types = len(accepted_arg_types)
+    namespace = {}
+    checked = []
+    for arg_num, accepted_arg_type in enumerate(accepted_arg_types):
+        if accepted_arg_type in ("self", "cls"):
+            continue
+        namespace["type_{0}".format(arg_num)] = accepted_arg_type
+        checked.append((arg_num, "{0!r}".format(ordinal(arg_num + 1))))
+    source = [
+        "def inputs_validator(*function_args, **function_args_dict):",
+        "    nb_args = len(function_args)",
+        "    if not function_args_dict:",
+        "        if nb_args != {0}:".format(nb_types),
+        "            raise InvalidArgumentNumberError(func_name)"]
+    for arg_num, ord_num in checked:
+        source.extend([
+            "        if type(function_args[{0}]) is not type_{0}:".format(
+                arg_num),
+            "            raise ArgumentValidationError({0}, func_name, "
+            "type_{1})".format(ord_num, arg_num)])
+    source.extend([
+        "        return validate_function(*function_args)",
+        "    if nb_args + len(function_args_dict) != {0}:".format(nb_types),
+        "        raise InvalidArgumentNumberError(func_name)"])
+    for arg_num, ord_num in checked:
+        source.extend([
+            "    if nb_args > {0} and type(function_args[{0}]) is not "
+            "type_{0}:".format(arg_num),
+            "        raise ArgumentValidationError({0}, func_name, "
+            "type_{1})".format(ord_num, arg_num)])
+    source.append(
+        "    return validate_function(*function_args, **function_args_dict)")
+    return compile_validator(
+        validate_function, "inputs_validator", source, namespace)
+
+
+def returns_validator(validate_function, accepted_return_type_tuple):
+    """ Generate a function that validates the returned types of a given
+    function.
+
+    The number of returned values and the exact type tests are unrolled in a
+    single specialized function.
+
+    Parameters
+    ----------
+    validate_function: callable (mandatory)
+        the function to be validated.
+    accepted_return_type_tuple: tuple (mandatory)
+        the expected returned types.
+
+    Returns
+    -------
+    validator: callable
+        the generated validator that wraps the input function.
+    """
+    nb_types = len(accepted_return_type_tuple)
+    namespace = {}
+    for arg_num, accepted_return_type in enumerate(
+            accepted_return_type_tuple):
+        namespace["type_{0}".format(arg_num)] = accepted_return_type
+    names = ["return_{0}".format(arg_num) for arg_num in range(nb_types)]
+    source = [
+        "def returns_validator(*function_args, **function_args_dict):",
+        "    return_values = validate_function(",
+        "        *function_args, **function_args_dict)"]
+    if nb_types == 0:
+        source.extend([
+            "    if return_values is None:",
+            "        return return_values"])
+    source.extend([
+        "    if isinstance(return_values, tuple):",
+        "        if len(return_values) != {0}:".format(nb_types),
+        "            raise InvalidReturnNumberError(func_name)"])
+    if nb_types > 0:
+        source.append("        {0}, = return_values".format(", ".join(names)))
+    source.append("    else:")
+    if nb_types == 1:
+        source.append("        return_0 = return_values")
+    else:
+        source.append("        raise InvalidReturnNumberError(func_name)")
+    for arg_num, name in enumerate(names):
+        source.extend([
+            "    if type({0}) is not type_{1}:".format(name, arg_num),
+            "        raise InvalidReturnType({0!r}, func_name, "
+            "type_{1})".format(ordinal(arg_num + 1), arg_num)])
+    source.append("    return return_values")
+    return compile_validator(
+        validate_function, "returns_validator", source, namespace)
+
+
 def inputs(*accepted_arg_types):
     """ A decorator to validate the parameter types of a given function.
 
@@ -70,30 +228,12 @@ def inputs(*accepted_arg_types):
     Note: It doesn't do a deep check, for example checking through a
           tuple of types.
     """
+    check_types(accepted_arg_types, special_types=("self", "cls"))
+
     def input_decorator(validate_function):
         """ Decorate the 'validate_function' function.
         """
-        @functools.wraps(validate_function)
-        def decorator_wrapper(*function_args, **function_args_dict):
-            """ Define a sub-decorator to check the function parameters.
-            """
-            nb_args = len(function_args) + len(function_args_dict)
-            if len(accepted_arg_types) != nb_args:
-                raise InvalidArgumentNumberError(validate_function.__name__)
-
-            for arg_num, (actual_arg, accepted_arg_type) in enumerate(
-                    zip(function_args, accepted_arg_types)):
-                if accepted_arg_type in ("self", "cls"):
-                    continue
-                if accepted_arg_type not in TYPES:
-                    raise InvalidType(accepted_arg_type)
-                if type(actual_arg) is not accepted_arg_type:
-                    ord_num = ordinal(arg_num + 1)
-                    raise ArgumentValidationError(ord_num,
-                                                  validate_function.__name__,
-                                                  accepted_arg_type)
-            return validate_function(*function_args, **function_args_dict)
-        return decorator_wrapper
+        return inputs_validator(validate_function, accepted_arg_types)
     return input_decorator
 
 
@@ -106,37 +246,35 @@ def returns(*accepted_return_type_tuple):
     Note: It doesn't do a deep check, for example checking through a
           tuple of types.
     """
+    check_types(accepted_return_type_tuple)
+
     def return_decorator(validate_function):
         """ Decorate the 'validate_function' function.
         """
-        @functools.wraps(validate_function)
-        def decorator_wrapper(*function_args, **function_args_dict):
-            """ Define a sub-decorator to check the function parameters.
-            """
-            return_values = validate_function(
-                *function_args, **function_args_dict)
-            if return_values is None and len(accepted_return_type_tuple) == 0:
-                return return_values
-            flatten = False
-            if not isinstance(return_values, tuple):
-                flatten = True
-                return_values = (return_values, )
-
-            if len(return_values) != len(accepted_return_type_tuple):
-                raise InvalidReturnNumberError(validate_function.__name__)
-
-            for arg_num, (return_value, accepted_return_type) in enumerate(
-                    zip(return_values, accepted_return_type_tuple)):
-                if accepted_return_type not in TYPES:
-                    raise InvalidType(accepted_return_type)
-                if type(return_value) is not accepted_return_type:
-                    ord_num = ordinal(arg_num + 1)
-                    raise InvalidReturnType(ord_num,
-                                            validate_function.__name__,
-                                            accepted_return_type)
-
-            if flatten:
-                return_values = return_values[0]
-            return return_values
-        return decorator_wrapper
+        return returns_validator(validate_function,
+                                 accepted_return_type_tuple)
     return return_decorator
+
+
+def compose(obj, type_decorators):
+    """ Apply a chain of type decorators to a function.
+
+    The chain is built once, when the function is decorated, and the
+    returned callable is then reused on every call.
+
+    Parameters
+    ----------
+    obj: callable (mandatory)
+        a function or a class method object.
+    type_decorators: list of 2-uplet (mandatory)
+        a list of decorator function, parameters ad tuple of types.
+
+    Returns
+    -------
+    checked_obj: callable
+        the input object wrapped by all the type decorators.
+    """
+    checked_obj = obj
+    for decorator, registered_types in type_decorators:
+        checked_obj = decorator(*registered_types)(checked_obj)
+    return checked_obj
@@ -41,6 +41,7 @@ setup(
     platforms=release_info["PLATFORMS"],
     extras_require=release_info["EXTRA_REQUIRES"],
     install_requires=release_info["REQUIRES"],
+    python_requires=release_info["PYTHON_REQUIRES"],
     package_data=pkgdata,
     scripts=scripts
 )